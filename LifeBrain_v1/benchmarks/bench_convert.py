@@ -0,0 +1,92 @@
+# benchmarks/bench_convert.py
+"""
+Currency conversions per second: one upstream request per conversion (the
+old path) versus the cached rate table in utils/converter, against the
+local stub from benchmarks/stubs.py. Also checks that conversions keep
+working from the snapshot when upstream is down and after a restart.
+
+    python benchmarks/bench_convert.py [conversions] [upstream_latency_s]
+"""
+import asyncio
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+TMP_DIR = tempfile.mkdtemp(prefix="lifebrain-bench-")
+os.environ.update(stubs.env_for("127.0.0.1", PORT))
+os.environ["LIFEBRAIN_DB"] = os.path.join(TMP_DIR, "convert.db")
+
+from utils import converter  # noqa: E402
+from utils.db import init_db  # noqa: E402
+from utils.http_client import close_clients, get_json  # noqa: E402
+
+CODES = sorted(stubs.RATES)
+
+
+async def per_request(amount, from_curr, to_curr):
+    # what convert_currency used to do: fetch the rate for every conversion
+    r = await get_json(converter.EXCHANGE_RATES_URL, params={"base": from_curr})
+    return amount * r["rates"][to_curr]
+
+
+async def timed(convert, pairs):
+    start = time.perf_counter()
+    for from_curr, to_curr in pairs:
+        await convert(100, from_curr, to_curr)
+    return len(pairs) / (time.perf_counter() - start)
+
+
+async def run(conversions, latency):
+    init_db()
+    rng = random.Random(1)
+    pairs = [(rng.choice(CODES), rng.choice(CODES)) for _ in range(conversions)]
+
+    stub_server, stop = await stubs.start_stubs("127.0.0.1", PORT, upstream_latency=latency)
+    slow = await timed(per_request, pairs[: max(1, conversions // 20)])
+    fast = await timed(converter.convert_currency, pairs)
+    start = time.perf_counter()
+    rates = await converter.get_rates()
+    for from_curr, to_curr in pairs:
+        converter.cross_rate(rates, from_curr, to_curr)
+    local_us = (time.perf_counter() - start) / conversions * 1e6
+    fetches = stub_server.calls["rates"]
+    await stop()
+    await close_clients()
+
+    print(f"upstream latency {latency * 1000:.0f} ms, {conversions} conversions")
+    print(f"  request per conversion   {slow:10.0f} /s")
+    print(f"  cached rate table        {fast:10.0f} /s   (formatted replies)")
+    print(f"  cross rate only          {local_us:10.2f} µs each")
+    print(f"  upstream fetches         {fetches - max(1, conversions // 20):10d}   (cached path)")
+
+    # upstream down: the table is stale but still served
+    converter._table["fetched_at"] -= converter.RATES_REFRESH
+    print("  upstream down:", (await converter.convert_currency(100, "USD", "EUR")).replace("\n", " | "))
+    # restart: fresh state, upstream still down, snapshot from SQLite
+    converter._table.update(rates={}, fetched_at=0.0)
+    converter._restored = False
+    converter._next_attempt = time.time() + converter.RATES_RETRY
+    print("  restart, upstream down:", (await converter.convert_currency(100, "EUR", "INR")).replace("\n", " | "))
+    await close_clients()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    upstream_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    asyncio.run(run(n, upstream_latency))
@@ -0,0 +1,123 @@
+# benchmarks/bench_daily_summary.py
+"""
+10k users whose daily summary falls in the same minute.
+
+Compares one independent summary job per user (tasks query + prefs query +
+weather + news each) with the batch pipeline in utils/daily_summary.
+Upstream calls are replaced by local stubs with a fixed latency; sending is
+a no-op, so the numbers isolate building the summaries.
+
+    python benchmarks/bench_daily_summary.py [users]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["LIFEBRAIN_DB"] = os.path.join(tempfile.mkdtemp(prefix="lifebrain-bench-"), "summary.db")
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+os.environ.setdefault("NEWS_API_KEY", "bench")
+
+from utils import datastore, news, weather  # noqa: E402
+from utils.db import init_db, get_tasks  # noqa: E402
+from utils.memory import init_memory, get_user_pref  # noqa: E402
+from utils.daily_summary import render_summary, run_daily_summaries, SUMMARY_CHUNK  # noqa: E402
+
+UPSTREAM_LATENCY = 0.05
+CITIES = ["chennai", "mumbai", "delhi", "bengaluru", "london", "paris", "tokyo", "new york"]
+CONCURRENCY = 50
+calls = {"weather": 0, "news": 0}
+
+
+async def fake_weather(city):
+    calls["weather"] += 1
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return f"🌤️ Weather in {city.title()}: Clear\n🌡️ 30°C | 💧 60%"
+
+
+async def fake_news(topic, language, page_size):
+    calls["news"] += 1
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return "🗞️ Headline\n🔗 https://example.com"
+
+
+def seed(users):
+    init_db()
+    init_memory()
+
+    def fill(conn):
+        conn.executemany(
+            "INSERT INTO memory (user_id, name, city, language, chatmode) VALUES (?, '', ?, '', 'default')",
+            ((uid, CITIES[uid % len(CITIES)]) for uid in range(users)),
+        )
+        conn.executemany(
+            "INSERT INTO tasks (user_id, task, time) VALUES (?, ?, ?)",
+            ((uid, f"task {n}", "09:00") for uid in range(users) for n in range(3)),
+        )
+    datastore.write(fill)
+
+
+def reset():
+    weather.weather_cache.clear()
+    news.news_cache.clear()
+    calls.update(weather=0, news=0)
+
+
+async def per_user(users):
+    """The old shape: every user runs its own queries and upstream calls."""
+    limit = asyncio.Semaphore(CONCURRENCY)
+    today = time.strftime("%A, %d %B %Y")
+
+    async def one(uid):
+        async with limit:
+            tasks = await get_tasks(uid)
+            city = await get_user_pref(uid, "city") or "your city"
+            # bypass the caches, as every job used to call the APIs itself
+            w = await fake_weather(weather.normalize_city(city))
+            n = await fake_news(news.DAILY_NEWS_TOPIC, "en", 3)
+            return render_summary(city, w, n, tasks, today)
+
+    await asyncio.gather(*(one(uid) for uid in range(users)))
+
+
+async def batch(users):
+    limit = asyncio.Semaphore(CONCURRENCY)
+
+    async def send(user_id, text):
+        async with limit:
+            pass
+
+    return await run_daily_summaries(list(range(users)), send)
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    seed(users)
+    weather._fetch_weather = fake_weather
+    news._fetch_news = fake_news
+
+    reset()
+    t0 = time.perf_counter()
+    await per_user(users)
+    old = time.perf_counter() - t0
+    old_calls = dict(calls)
+
+    reset()
+    t0 = time.perf_counter()
+    await batch(users)
+    new = time.perf_counter() - t0
+
+    print(f"users due in one minute: {users}   upstream latency: {UPSTREAM_LATENCY * 1000:.0f} ms")
+    print(f"per-user jobs:   {old:7.2f} s  {users / old:8.0f} summaries/s  "
+          f"weather calls {old_calls['weather']}, news calls {old_calls['news']}, DB queries {2 * users}")
+    print(f"batch pipeline:  {new:7.2f} s  {users / new:8.0f} summaries/s  "
+          f"weather calls {calls['weather']}, news calls {calls['news']}, "
+          f"DB queries {2 * -(-users // SUMMARY_CHUNK)}")
+    datastore.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_datastore.py
+"""
+Task/preference ops per second: the old connect-per-call access pattern
+versus the shared WAL connection in utils/datastore.
+
+    python benchmarks/bench_datastore.py [ops]
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="lifebrain-bench-")
+os.environ["LIFEBRAIN_DB"] = os.path.join(TMP_DIR, "datastore.db")
+
+from utils import datastore  # noqa: E402
+from utils.db import init_db, add_task, get_tasks  # noqa: E402
+from utils.memory import init_memory, get_user_pref, set_user_pref  # noqa: E402
+
+USERS = 200
+
+
+# --- baseline: one sqlite3.connect per call, rollback journal ---
+def legacy_setup(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, task TEXT, time TEXT)")
+        conn.execute("CREATE TABLE memory (user_id INTEGER PRIMARY KEY, name TEXT, city TEXT, language TEXT, chatmode TEXT)")
+
+
+def legacy_add_task(path, user_id, task, time_str):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO tasks (user_id, task, time) VALUES (?, ?, ?)", (user_id, task, time_str))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_tasks(path, user_id):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT task, time FROM tasks WHERE user_id=?", (user_id,)).fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_get_pref(path, user_id):
+    with sqlite3.connect(path) as conn:
+        row = conn.execute("SELECT city FROM memory WHERE user_id=?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+
+def bench_legacy(ops):
+    path = os.path.join(TMP_DIR, "legacy.db")
+    legacy_setup(path)
+    start = time.perf_counter()
+    for i in range(ops):
+        uid = i % USERS
+        if i % 4 == 0:
+            legacy_add_task(path, uid, f"task {i}", "09:00")
+        elif i % 4 == 1:
+            legacy_get_pref(path, uid)
+        else:
+            legacy_get_tasks(path, uid)
+    return ops / (time.perf_counter() - start)
+
+
+async def bench_datastore(ops):
+    init_db()
+    init_memory()
+    for uid in range(USERS):
+        await set_user_pref(uid, "city", "chennai")
+    start = time.perf_counter()
+    for i in range(ops):
+        uid = i % USERS
+        if i % 4 == 0:
+            await add_task(uid, f"task {i}", "09:00")
+        elif i % 4 == 1:
+            await get_user_pref(uid, "city")
+        else:
+            await get_tasks(uid)
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    legacy = bench_legacy(ops)
+    shared = asyncio.run(bench_datastore(ops))
+    datastore.close()
+    print(f"ops per run:            {ops}  (25% add_task, 25% get_user_pref, 50% get_tasks)")
+    print(f"connect-per-call:       {legacy:10.0f} ops/s")
+    print(f"shared WAL datastore:   {shared:10.0f} ops/s  ({shared / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_intents.py
+"""
+Intent matching throughput as the trigger corpus grows: the old per-message
+substring scan over a dict versus the compiled IntentEngine.
+
+    python benchmarks/bench_intents.py [messages]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.intents import IntentEngine  # noqa: E402
+
+SIZES = [4, 100, 1000, 5000]
+rng = random.Random(42)
+VOCAB = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8))) for _ in range(3000)]
+
+
+def make_corpus(size):
+    intents = []
+    for i in range(size):
+        triggers = [" ".join(rng.sample(VOCAB, rng.randint(1, 3))) for _ in range(3)]
+        intents.append({"name": f"intent_{i}", "triggers": triggers, "replies": {"default": [f"reply {i}"]}})
+    return intents
+
+
+def make_messages(intents, count):
+    messages = []
+    for i in range(count):
+        words = rng.sample(VOCAB, 10)
+        if i % 2 == 0:  # half the messages contain a trigger
+            words.insert(5, rng.choice(rng.choice(intents)["triggers"]))
+        messages.append(" ".join(words))
+    return messages
+
+
+def legacy_match(responses, text):
+    for key, vals in responses.items():
+        if key in text:
+            return vals
+    return None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    print(f"{'intents':>8} {'phrases':>8} {'build ms':>9} {'legacy match/s':>15} {'engine match/s':>15}")
+    for size in SIZES:
+        intents = make_corpus(size)
+        messages = make_messages(intents, count)
+        responses = {t: i["replies"]["default"] for i in intents for t in i["triggers"]}
+
+        start = time.perf_counter()
+        engine = IntentEngine(intents, {"default": ["fallback"]})
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for text in messages:
+            legacy_match(responses, text)
+        legacy = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for text in messages:
+            engine.respond(text)
+        compiled = count / (time.perf_counter() - start)
+        print(f"{size:>8} {len(responses):>8} {build_ms:>9.1f} {legacy:>15.0f} {compiled:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_prefs.py
+"""
+Preference lookups per second: a query per get_user_pref call (the old
+path) versus the write-through cache in utils/memory, plus the cost of a
+bulk prefetch and of writes.
+
+    python benchmarks/bench_prefs.py [users] [lookups]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="lifebrain-bench-")
+os.environ["LIFEBRAIN_DB"] = os.path.join(TMP_DIR, "prefs.db")
+
+from utils import datastore  # noqa: E402
+from utils.memory import (  # noqa: E402
+    PREF_FIELDS, init_memory, get_user_pref, set_user_pref, prefetch_prefs, prefs_cache,
+)
+
+
+def seed(users):
+    rows = [(uid, f"user{uid}", f"city{uid % 100}", "en", "default") for uid in range(users)]
+    datastore.write(lambda conn: conn.executemany(
+        "INSERT INTO memory (user_id, name, city, language, chatmode) VALUES (?, ?, ?, ?, ?)", rows
+    ))
+
+
+async def uncached_get_pref(user_id, field):
+    row = await datastore.fetchone(f"SELECT {field} FROM memory WHERE user_id=?", (user_id,))
+    return row[0] if row and row[0] is not None else None
+
+
+async def timed(lookup, keys):
+    start = time.perf_counter()
+    for user_id, field in keys:
+        await lookup(user_id, field)
+    return len(keys) / (time.perf_counter() - start)
+
+
+async def run(users, lookups):
+    init_memory()
+    seed(users)
+    rng = random.Random(1)
+    keys = [(rng.randrange(users), rng.choice(PREF_FIELDS)) for _ in range(lookups)]
+
+    uncached = await timed(uncached_get_pref, keys)
+
+    start = time.perf_counter()
+    await prefetch_prefs(range(users))
+    prefetch = time.perf_counter() - start
+    cached = await timed(get_user_pref, keys)
+
+    prefs_cache.clear()
+    cold = await timed(get_user_pref, keys)
+
+    start = time.perf_counter()
+    for i in range(2000):
+        await set_user_pref(i % users, "city", f"city{i}")
+    writes = 2000 / (time.perf_counter() - start)
+    assert await get_user_pref(1999 % users, "city") == "city1999"
+    return uncached, cached, cold, prefetch, writes
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    uncached, cached, cold, prefetch, writes = asyncio.run(run(users, lookups))
+    datastore.close()
+    print(f"users / lookups:          {users} / {lookups}")
+    print(f"query per lookup:         {uncached:10.0f} lookups/s")
+    print(f"cache, cold start:        {cold:10.0f} lookups/s")
+    print(f"cache, after prefetch:    {cached:10.0f} lookups/s  ({cached / uncached:.0f}x)")
+    print(f"bulk prefetch:            {prefetch * 1000:10.1f} ms for {users} users")
+    print(f"upsert writes:            {writes:10.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
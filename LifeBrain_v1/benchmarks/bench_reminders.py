@@ -0,0 +1,65 @@
+# benchmarks/bench_reminders.py
+"""
+Reminder engine at scale.
+
+Loads N pending reminders spread over the next 24h into SQLite, starts a
+ReminderEngine and reports load time and resident heap size (only the
+current window is held in memory). Restart and exactly-once behaviour is
+checked by benchmarks/check_reminders.py.
+
+    python benchmarks/bench_reminders.py [pending]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["LIFEBRAIN_DB"] = os.path.join(tempfile.mkdtemp(prefix="lifebrain-bench-"), "reminders.db")
+
+from utils import datastore  # noqa: E402
+from utils.db import init_db  # noqa: E402
+from utils.reminders import ReminderEngine  # noqa: E402
+
+
+def insert_reminders(rows):
+    datastore.write(lambda conn: conn.executemany(
+        "INSERT INTO tasks (user_id, task, time, due_at) VALUES (?, ?, ?, ?)", rows
+    ))
+
+
+async def main():
+    pending = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    init_db()
+    now = int(time.time())
+    insert_reminders(
+        (i % 50_000, f"task {i}", "00:00", now + 60 + (i * 86_400) // pending)
+        for i in range(pending)
+    )
+
+    sent = []
+
+    async def send(user_id, text):
+        sent.append((user_id, text))
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    engine = ReminderEngine(send)
+    await engine.start()
+    load_ms = (time.perf_counter() - t0) * 1000
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"pending reminders in SQLite:   {pending}")
+    print(f"loaded into the window heap:   {len(engine)}  (window {engine.window}s)")
+    print(f"startup load:                  {load_ms:.1f} ms")
+    print(f"engine memory (current/peak):  {current / 1024:.0f} KiB / {peak / 1024:.0f} KiB")
+
+    await engine.stop()
+    datastore.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
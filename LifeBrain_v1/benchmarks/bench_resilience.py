@@ -0,0 +1,110 @@
+# benchmarks/bench_resilience.py
+"""
+/weather during an upstream outage, against the fault-injecting stubs in
+benchmarks/stubs.py: the old behaviour (fixed HTTP_TIMEOUT, no breaker)
+versus the circuit breaker with adaptive timeouts, then recovery through
+the half-open probe, and the tail latency hedged GETs cut when a fraction
+of responses are slow.
+
+    python benchmarks/bench_resilience.py [calls]
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update(stubs.env_for("127.0.0.1", PORT))
+# every call goes upstream; the cache only supplies degraded answers
+os.environ.update({"WEATHER_CACHE_TTL": "0", "WEATHER_CACHE_STALE": "0", "BREAKER_COOLDOWN": "2"})
+
+from utils import http_client  # noqa: E402
+from utils.weather import get_weather  # noqa: E402
+
+CITIES = [f"city{i}" for i in range(20)]
+OUTAGE = 60.0  # seconds the stub takes to answer while "down"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def timed_calls(calls, concurrency=20):
+    latencies, degraded, failed = [], 0, 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal degraded, failed
+        async with semaphore:
+            start = time.perf_counter()
+            text = await get_weather(CITIES[i % len(CITIES)])
+            latencies.append(time.perf_counter() - start)
+            degraded += "last known" in text
+            failed += text.startswith("⚠️")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return {
+        "wall_s": time.perf_counter() - start,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "degraded": degraded,
+        "failed": failed,
+    }
+
+
+def show(label, result):
+    print(f"  {label:<34} wall {result['wall_s']:6.2f} s  p50 {result['p50_ms']:8.1f} ms  "
+          f"p99 {result['p99_ms']:8.1f} ms  cached answers {result['degraded']:4d}  errors {result['failed']:4d}")
+
+
+async def run(calls):
+    stub_server, stop = await stubs.start_stubs("127.0.0.1", PORT, upstream_latency=0.01)
+    breaker = http_client.get_breaker("openweather")
+    try:
+        print(f"{calls} /weather calls per phase, 20 concurrent")
+        show("healthy", await timed_calls(calls))
+        print(f"  adaptive timeout after warm-up: {breaker.timeout() * 1000:.0f} ms (cap {http_client.HTTP_TIMEOUT:.0f} s)")
+
+        stub_server.inject("weather", latency=OUTAGE)
+        # old behaviour: every call waits the full fixed timeout
+        failures, timeout_min = http_client.BREAKER_FAILURES, http_client.HTTP_TIMEOUT_MIN
+        http_client.BREAKER_FAILURES, http_client.HTTP_TIMEOUT_MIN = 10 ** 9, http_client.HTTP_TIMEOUT
+        show("outage, fixed timeout, no breaker", await timed_calls(20))
+        http_client.BREAKER_FAILURES, http_client.HTTP_TIMEOUT_MIN = failures, timeout_min
+        breaker.failures = 0
+
+        show("outage, breaker + adaptive timeout", await timed_calls(calls))
+        print(f"  breaker state {breaker.state}, short-circuited calls {breaker.short_circuits}")
+
+        stub_server.heal()
+        await asyncio.sleep(http_client.BREAKER_COOLDOWN)
+        show("recovered (half-open probe)", await timed_calls(calls))
+        print(f"  breaker state {breaker.state}")
+
+        stub_server.inject("weather", latency=0.3, slow_rate=0.03)
+        show("3% slow responses, no hedging", await timed_calls(calls))
+        http_client.HTTP_HEDGE = True
+        show("3% slow responses, hedged GETs", await timed_calls(calls))
+        print(f"  hedged requests {breaker.hedges} of {breaker.calls} calls")
+    finally:
+        await stop()
+        await http_client.close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 400))
@@ -0,0 +1,74 @@
+# benchmarks/bench_solver.py
+"""
+/solve throughput: the old eval() with a per-call math whitelist versus the
+AST evaluator with its compiled-expression cache, plus the cost of the
+inputs that used to freeze the bot.
+
+    python benchmarks/bench_solver.py [iterations]
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.solver import evaluate, solve_expression, shutdown_pool, compile_expression  # noqa: E402
+
+EXPRESSIONS = [
+    "25*(4/3)",
+    "24*(5/3)",
+    "sqrt(16) + pi",
+    "sin(pi/2) * cos(0)",
+    "(1+2)*(3+4)/5 - 6",
+    "log(1000, 10)",
+    "2**16 - 1",
+    "factorial(20) % 97",
+]
+PATHOLOGICAL = ["9**9**9", "factorial(10**6)", "2**9999 * 2**9999"]
+
+
+def legacy_solve(expr):
+    allowed_names = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
+    return eval(expr, {"__builtins__": {}}, allowed_names)
+
+
+def rate(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(EXPRESSIONS[i % len(EXPRESSIONS)])
+    return iterations / (time.perf_counter() - start)
+
+
+async def async_rate(iterations):
+    start = time.perf_counter()
+    await asyncio.gather(*(solve_expression(EXPRESSIONS[i % len(EXPRESSIONS)]) for i in range(iterations)))
+    return iterations / (time.perf_counter() - start)
+
+
+async def pathological():
+    results = []
+    for expr in PATHOLOGICAL:
+        start = time.perf_counter()
+        reply = await solve_expression(expr)
+        results.append((expr, (time.perf_counter() - start) * 1000, reply))
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    legacy = rate(legacy_solve, iterations)
+    compile_expression.cache_clear()
+    ast_eval = rate(evaluate, iterations)
+    served = asyncio.run(async_rate(min(iterations, 5_000)))
+    print(f"legacy eval():                 {legacy:10.0f} expr/s")
+    print(f"AST evaluator (cached):        {ast_eval:10.0f} expr/s  cache {compile_expression.cache_info()}")
+    print(f"solve_expression (async, mix): {served:10.0f} expr/s  (powers/factorials go to the process pool)")
+    for expr, ms, reply in asyncio.run(pathological()):
+        print(f"{expr!r:24} {ms:8.1f} ms  {reply}")
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
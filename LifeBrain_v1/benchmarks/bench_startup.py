@@ -0,0 +1,95 @@
+# benchmarks/bench_startup.py
+"""
+Import-to-ready time of the bot: each run is a fresh interpreter that
+imports main.py, builds the Application and runs its startup (getMe against
+the fake Bot API from benchmarks/stubs.py, database, intents, scheduler),
+reporting main.startup_timings per phase.
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+# runs in the child interpreter; prints one JSON line of phase timings
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio, json
+import main
+
+async def ready():
+    app = main.build_app(port=0)
+    await app.initialize()
+    await app.post_init(app)
+    total = time.perf_counter() - started
+    await app.shutdown()
+    await app.post_shutdown(app)
+    return total
+
+total = asyncio.run(ready())
+print(json.dumps({**main.startup_timings, "total": total}))
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def measure(port, env):
+    stub_server, stop = await stubs.start_stubs("127.0.0.1", port)
+    results = []
+    try:
+        for i in range(RUNS):
+            env["LIFEBRAIN_DB"] = os.path.join(env["LOG_DIR"], f"startup{i}.db")  # cold database each run
+            started = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", CHILD, cwd=ROOT, env=env,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            )
+            out, _ = await proc.communicate()
+            if proc.returncode:
+                raise RuntimeError(f"startup run {i} failed with exit code {proc.returncode}")
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            result["process"] = time.perf_counter() - started  # includes interpreter start and exit
+            results.append(result)
+    finally:
+        await stop()
+    return results, stub_server.calls
+
+
+if __name__ == "__main__":
+    port = free_port()
+    tmp_dir = tempfile.mkdtemp(prefix="lifebrain-startup-")
+    env = dict(os.environ, **stubs.env_for("127.0.0.1", port))
+    env.update({"TELEGRAM_BOT_TOKEN": "123456:STARTUP", "LOG_DIR": tmp_dir, "METRICS_PORT": "0"})
+
+    results, calls = asyncio.run(measure(port, env))
+    print(f"{RUNS} runs, median (min) in ms; getMe calls: {calls['bot.getMe']}")
+    for phase in results[0]:
+        values = [r[phase] * 1000 for r in results]
+        print(f"  {phase:<10} {statistics.median(values):8.1f} ({min(values):.1f})")
+    print("  (total = import to ready in-process; process = wall time of the whole child)")
+    # the slowest imports of one cold run
+    trace = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env,
+                           capture_output=True, text=True).stderr.splitlines()
+    top = sorted((line.split("|") for line in trace if line.startswith("import time:") and "self" not in line),
+                 key=lambda cols: int(cols[1]), reverse=True)[:8]
+    print("slowest imports of `import main` (cumulative ms):")
+    for cols in top:
+        print(f"  {int(cols[1]) / 1000:8.1f}  {cols[2].strip()}")
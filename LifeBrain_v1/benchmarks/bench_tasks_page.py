@@ -0,0 +1,64 @@
+# benchmarks/bench_tasks_page.py
+"""
+/showtasks latency against the number of tasks a user has: the old
+render-everything path versus keyset pages (first and deepest page,
+uncached) and pages served from the render cache.
+
+    python benchmarks/bench_tasks_page.py [sizes, comma separated] [repeats]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="lifebrain-bench-")
+os.environ["LIFEBRAIN_DB"] = os.path.join(TMP_DIR, "tasks.db")
+
+import main  # noqa: E402
+from utils import datastore  # noqa: E402
+from utils.db import init_db, get_tasks, task_pages  # noqa: E402
+
+
+def seed(user_id, count):
+    rows = [(user_id, f"task number {i}", f"{i % 24:02d}:{i % 60:02d}") for i in range(count)]
+    datastore.write(lambda conn: conn.executemany("INSERT INTO tasks (user_id, task, time) VALUES (?, ?, ?)", rows))
+    return datastore.read(lambda conn: conn.execute("SELECT MAX(id) FROM tasks WHERE user_id=?", (user_id,)).fetchone()[0])
+
+
+async def render_all(user_id):
+    # the old format_tasks_text
+    tasks = await get_tasks(user_id)
+    lines = [f"{i+1}. {t[0]} — ⏰ {t[1]}" for i, t in enumerate(tasks)]
+    return "📋 <b>Your Tasks:</b>\n" + "\n".join(lines)
+
+
+async def timed_ms(fn, repeats, uncached=False):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if uncached:
+            task_pages.clear()
+        await fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+async def run(sizes, repeats):
+    init_db()
+    print(f"{'tasks':>8} {'render all':>12} {'first page':>12} {'last page':>12} {'cached page':>12}   (ms per call)")
+    for n, size in enumerate(sizes):
+        user_id = n + 1
+        last_id = seed(user_id, size)
+        page_size = main.TASKS_PAGE_SIZE
+        last_start = max(1, size - page_size + 1)
+        full = await timed_ms(lambda: render_all(user_id), max(1, repeats // 10))
+        first = await timed_ms(lambda: main.tasks_page(user_id), repeats, uncached=True)
+        last = await timed_ms(lambda: main.tasks_page(user_id, last_id + 1, last_start, before=True), repeats, uncached=True)
+        cached = await timed_ms(lambda: main.tasks_page(user_id), repeats)
+        print(f"{size:>8} {full:>12.3f} {first:>12.3f} {last:>12.3f} {cached:>12.4f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10, 1000, 10000, 100000]
+    asyncio.run(run(sizes, int(sys.argv[2]) if len(sys.argv) > 2 else 200))
@@ -0,0 +1,88 @@
+# benchmarks/bench_writes.py
+"""
+Task and preference writes per second under concurrent load: one
+transaction per write (the old path) versus the group-commit queue in
+utils/datastore, with SQLite's synchronous=NORMAL and FULL.
+
+    python benchmarks/bench_writes.py [writers] [writes_per_writer]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="lifebrain-bench-")
+os.environ["LIFEBRAIN_DB"] = os.path.join(TMP_DIR, "writes.db")
+
+from utils import datastore  # noqa: E402
+from utils.db import init_db, add_task, get_tasks  # noqa: E402
+from utils.memory import init_memory, get_user_pref, set_user_pref, prefs_cache, _UPSERT  # noqa: E402
+
+
+async def direct_add_task(user_id, task, time_str):
+    return await datastore.run_write(lambda conn: conn.execute(
+        "INSERT INTO tasks (user_id, task, time) VALUES (?, ?, ?)", (user_id, task, time_str)
+    ).lastrowid)
+
+
+async def direct_set_city(user_id, city):
+    await datastore.execute(_UPSERT["city"], (user_id, "", city, "", "default"))
+
+
+async def queued_set_city(user_id, city):
+    await set_user_pref(user_id, "city", city)
+
+
+async def writer(user_id, writes, add, set_city):
+    # alternate inserts and upserts, like a user adding tasks and setting preferences
+    for i in range(writes):
+        if i % 2:
+            await set_city(user_id, f"city{i}")
+        else:
+            await add(user_id, f"task {i}", "10:00")
+
+
+async def run_mode(writers, writes, add, set_city):
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(1000 + w, writes, add, set_city) for w in range(writers)))
+    return writers * writes / (time.perf_counter() - start)
+
+
+async def check_read_your_writes(users=200):
+    # fire-and-forget writes, then read each user back straight away
+    prefs_cache.clear()
+    futures = [datastore.queue_write(_UPSERT["city"], (uid, "", "ryw", "", "default"), key=uid) for uid in range(users)]
+    futures += [datastore.queue_write("INSERT INTO tasks (user_id, task, time) VALUES (?, 'ryw', '10:00')", (uid,), key=uid)
+                for uid in range(users)]
+    ok = 0
+    for uid in range(users):
+        city = await get_user_pref(uid, "city")
+        tasks = await get_tasks(uid)
+        ok += city == "ryw" and ("ryw", "10:00") in tasks
+    await asyncio.gather(*futures)
+    return ok, users
+
+
+async def run(writers, writes):
+    init_db()
+    init_memory()
+    print(f"{writers} concurrent writers x {writes} writes (half add_task, half set_user_pref)")
+    for synchronous in ("NORMAL", "FULL"):
+        datastore.close()
+        datastore.SQLITE_SYNCHRONOUS = synchronous
+        direct = await run_mode(writers, writes, direct_add_task, direct_set_city)
+        queued = await run_mode(writers, writes, add_task, queued_set_city)
+        print(f"  synchronous={synchronous:<6} one transaction per write {direct:9.0f} /s"
+              f"   group commit {queued:9.0f} /s   ({queued / direct:.1f}x)")
+    ok, users = await check_read_your_writes()
+    print(f"  read-your-writes: {ok}/{users} users saw their queued writes")
+    datastore.close()
+
+
+if __name__ == "__main__":
+    n_writers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_writes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(n_writers, n_writes))
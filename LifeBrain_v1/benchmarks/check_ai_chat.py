@@ -0,0 +1,152 @@
+# benchmarks/check_ai_chat.py
+"""
+Offline check of the AI chat backend (utils/ai_chat.py) against the
+streaming /chat/completions stub in benchmarks/stubs.py: progressive
+edits while the answer streams, per-user history trimmed to
+CHAT_HISTORY_TURNS and CHAT_TOKEN_BUDGET, and identical in-flight requests
+from different users sharing one upstream completion; also that the
+shipped .env only turns AI chat on when it holds a real key. Exits
+non-zero on the first failed check.
+
+    python benchmarks/check_ai_chat.py
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+HISTORY_TURNS = 2
+TOKEN_BUDGET = 300
+os.environ.update(stubs.env_for("127.0.0.1", PORT))
+os.environ.update({
+    "LIFEBRAIN_DB": os.path.join(tempfile.mkdtemp(prefix="lifebrain-check-"), "chat.db"),
+    "OPENAI_KEY": "stub",
+    "CHAT_EDIT_INTERVAL": "0.05",
+    "CHAT_HISTORY_TURNS": str(HISTORY_TURNS),
+    "CHAT_TOKEN_BUDGET": str(TOKEN_BUDGET),
+})
+
+from utils import ai_chat  # noqa: E402
+from utils.http_client import close_clients  # noqa: E402
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAIL: {message}")
+    print(f"ok: {message}")
+
+
+async def check_streaming(stub):
+    updates = []
+
+    async def on_update(partial):
+        updates.append(partial)
+
+    answer = await ai_chat.ai_reply(1, "tell me a story about a very patient robot", "default", on_update)
+    check(answer == "You said: tell me a story about a very patient robot (0 earlier messages)",
+          "streamed answer is reassembled from the deltas")
+    check(len(updates) >= 2, f"the reply was edited while streaming ({len(updates)} edits)")
+    check(all(u.endswith(" ▌") for u in updates), "partial edits carry the typing cursor")
+    texts = [u[:-2] for u in updates]
+    check(all(b.startswith(a) for a, b in zip(texts, texts[1:])) and answer.startswith(texts[-1]),
+          "each edit extends the previous one")
+
+
+async def check_history(stub):
+    for i in range(4):
+        await ai_chat.ai_reply(2, f"question {i}", "default")
+    sent = stub.completions[-1]
+    history = sent[1:-1]
+    check(len(history) == HISTORY_TURNS * 2, f"history is trimmed to the last {HISTORY_TURNS} turns")
+    check(history[0]["content"] == "question 1" and history[-1]["role"] == "assistant",
+          "the oldest turns are dropped first")
+
+    await ai_chat.ai_reply(3, "x" * 800, "default")
+    await ai_chat.ai_reply(3, "and now?", "default")
+    sent = stub.completions[-1]
+    check(sum(ai_chat.estimate_tokens(m["content"]) for m in sent) <= TOKEN_BUDGET,
+          "messages sent stay within CHAT_TOKEN_BUDGET")
+    check(all(m["content"] != "x" * 800 for m in sent), "the turn that no longer fits the budget is left out")
+    check(all("question" not in m["content"] for m in sent), "histories are kept per user")
+
+
+async def check_coalescing(stub):
+    # one user's updates are handled in order, so identical requests in flight
+    # together come from different users with the same context (e.g. new users)
+    users = range(10, 15)
+    updates = {user_id: [] for user_id in users}
+
+    def recorder(user_id):
+        async def on_update(partial):
+            updates[user_id].append(partial)
+        return on_update
+
+    before = stub.calls["chat/completions"]
+    answers = await asyncio.gather(*(ai_chat.ai_reply(user_id, "good  morning" if user_id % 2 else "good morning",
+                                                      "default", recorder(user_id)) for user_id in users))
+    check(stub.calls["chat/completions"] - before == 1, "identical in-flight requests share one completion")
+    check(len(set(answers)) == 1, "every waiter gets the shared answer")
+    check(all(updates.values()), "every waiter gets the streaming edits")
+    check(all(len(ai_chat._histories[user_id]) == 2 for user_id in users), "each user's history records the turn")
+
+    before = stub.calls["chat/completions"]
+    await asyncio.gather(ai_chat.ai_reply(10, "good morning", "default"), ai_chat.ai_reply(20, "good morning", "default"))
+    check(stub.calls["chat/completions"] - before == 2, "the same prompt with a different context is not coalesced")
+
+    before = stub.calls["chat/completions"]
+    await asyncio.gather(ai_chat.ai_reply(21, "good morning", "coach"), ai_chat.ai_reply(22, "good morning", "study"))
+    check(stub.calls["chat/completions"] - before == 2, "the same prompt in a different chat mode is not coalesced")
+
+
+# run in a fresh process: main.py loads .env, and ai_chat reads the key on import
+ENV_PROBE = """
+import asyncio, main
+from utils import ai_chat
+print(ai_chat.ai_enabled())
+print(asyncio.run(ai_chat.ai_reply(1, "hello", "default")))
+"""
+
+
+def check_shipped_env():
+    from dotenv import dotenv_values
+
+    key = (dotenv_values(os.path.join(ROOT, ".env")).get("OPENAI_KEY") or "").strip()
+    env = {k: v for k, v in os.environ.items() if not k.startswith("OPENAI_")}
+    out = subprocess.run([sys.executable, "-c", ENV_PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    check(out[0] == str(bool(key)), f"the shipped .env {'enables' if key else 'leaves off'} AI chat")
+    if not key:
+        check(not out[1].startswith("(AI error"), "without a key chat answers offline")
+
+
+async def run():
+    check_shipped_env()
+    stub, stop = await stubs.start_stubs("127.0.0.1", PORT, token_interval=0.02)
+    try:
+        await check_streaming(stub)
+        await check_history(stub)
+        await check_coalescing(stub)
+    finally:
+        await stop()
+        await close_clients()
+    print("all AI chat checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,139 @@
+# benchmarks/check_dispatcher.py
+"""
+Offline check of the outbound dispatcher (utils/dispatcher.py) against the
+fake Bot API in benchmarks/stubs.py: the per-chat and global token buckets
+space out what reaches the server, flood waits (429 with retry_after) are
+retried after the requested wait and given up after SEND_MAX_RETRIES, and
+interactive replies overtake queued bulk sends, both within one chat and
+across chats when the global limit is the bottleneck. Exits non-zero on
+the first failed check; takes about ten seconds.
+
+    python benchmarks/check_dispatcher.py
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+from telegram import Bot  # noqa: E402
+from telegram.error import RetryAfter  # noqa: E402
+from telegram.request import HTTPXRequest  # noqa: E402
+from utils.dispatcher import BULK, INTERACTIVE, Dispatcher  # noqa: E402
+
+TOLERANCE = 0.03  # seconds of timer slack allowed per gap
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAIL: {message}")
+    print(f"ok: {message}")
+
+
+async def dispatch(bot, sends, **limits):
+    """Deliver `sends` [(delay before submitting, chat_id, text, priority), ...] through a fresh Dispatcher."""
+    dispatcher = Dispatcher(bot, **limits)
+    await dispatcher.start()
+
+    async def one(delay, chat_id, text, priority):
+        await asyncio.sleep(delay)
+        return await dispatcher.send_message(chat_id, text, priority=priority)
+
+    try:
+        results = await asyncio.gather(*(one(*send) for send in sends), return_exceptions=True)
+    finally:
+        await dispatcher.stop()
+    return dispatcher, results
+
+
+def sent_since(stub, started, chat_id=None):
+    return [(at, chat, text) for at, chat, text in stub.sent if at >= started and chat_id in (None, chat)]
+
+
+async def check_buckets(stub, bot):
+    started = time.monotonic()
+    await dispatch(bot, [(0, 1, f"chat {i}", BULK) for i in range(6)], chat_rate=10, chat_burst=1)
+    sent = sent_since(stub, started, 1)
+    gaps = [b[0] - a[0] for a, b in zip(sent, sent[1:])]
+    check([text for _, _, text in sent] == [f"chat {i}" for i in range(6)], "one chat's messages keep their order")
+    check(min(gaps) >= 0.1 - TOLERANCE, f"one chat gets at most SEND_CHAT_RATE (min gap {min(gaps) * 1000:.0f} ms)")
+
+    started = time.monotonic()
+    await dispatch(bot, [(0, 100 + i, "global", BULK) for i in range(100)], global_rate=50)
+    sent = sent_since(stub, started)
+    span = sent[-1][0] - sent[0][0]
+    # the bucket starts full (50), the other 50 need a second at 50/s
+    check(len(sent) == 100 and span >= 1.0 - TOLERANCE, f"all chats together get at most SEND_GLOBAL_RATE ({span:.2f} s)")
+
+
+async def check_flood_wait(stub, bot):
+    stub.inject("bot", error_rate=1.0, status=429, retry_after=1, times=2)
+    started = time.monotonic()
+    dispatcher, results = await dispatch(bot, [(0, 200, "after flood wait", INTERACTIVE)])
+    elapsed = time.monotonic() - started
+    check(not isinstance(results[0], Exception) and dispatcher.flood_waits == 2,
+          "a message answered with 429 is delivered once the flood wait is over")
+    check(elapsed >= 2.0 - TOLERANCE, f"the dispatcher waits retry_after before each retry ({elapsed:.2f} s)")
+
+    stub.inject("bot", error_rate=1.0, status=429, retry_after=1)
+    dispatcher, results = await dispatch(bot, [(0, 201, "never", INTERACTIVE)], max_retries=1)
+    stub.heal("bot")
+    check(isinstance(results[0], RetryAfter) and dispatcher.failed == 1,
+          "persistent flood waits are given up after SEND_MAX_RETRIES and raised to the caller")
+
+
+async def check_priority(stub, bot):
+    started = time.monotonic()
+    sends = [(0, 7, f"bulk {i}", BULK) for i in range(10)] + [(0.05, 7, "reply", INTERACTIVE)]
+    await dispatch(bot, sends, chat_rate=10, chat_burst=1)
+    texts = [text for _, _, text in sent_since(stub, started, 7)]
+    check(texts.index("reply") <= 2, f"within a chat the reply overtakes queued bulk sends (position {texts.index('reply') + 1} of 11)")
+
+    # fewer workers than bulk sends, and the reply only once the burst of 50 is out:
+    # at most `workers` bulk sends are already past the queue when it arrives
+    workers = 8
+    started = time.monotonic()
+    dispatcher = Dispatcher(bot, global_rate=50, workers=workers)
+    await dispatcher.start()
+    try:
+        bulk = [asyncio.ensure_future(dispatcher.send_message(300 + i, f"bulk {i}", priority=BULK)) for i in range(100)]
+        while len(sent_since(stub, started)) < 50:
+            await asyncio.sleep(0.005)
+        before = len(sent_since(stub, started))
+        await dispatcher.send_message(999, "reply", priority=INTERACTIVE)
+        await asyncio.gather(*bulk)
+    finally:
+        await dispatcher.stop()
+    texts = [text for _, _, text in sent_since(stub, started)]
+    check(texts.index("reply") <= before + workers,
+          f"across chats the reply overtakes every bulk send still waiting for the global limit "
+          f"(position {texts.index('reply') + 1} of 101, {before} sent before it was queued)")
+
+
+async def run():
+    port = free_port()
+    stub, stop = await stubs.start_stubs("127.0.0.1", port)
+    bot = Bot("123456:CHECK", base_url=f"http://127.0.0.1:{port}/bot",
+              request=HTTPXRequest(connection_pool_size=128))
+    try:
+        async with bot:
+            await check_buckets(stub, bot)
+            await check_flood_wait(stub, bot)
+            await check_priority(stub, bot)
+    finally:
+        await stop()
+    print("all dispatcher checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
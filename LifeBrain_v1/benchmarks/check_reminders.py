@@ -0,0 +1,112 @@
+# benchmarks/check_reminders.py
+"""
+Offline check of the reminder engine (utils/reminders.py) across restarts,
+with a handful of rows: reminders missed while the bot was down fire once
+after a restart (or are dropped beyond REMINDER_MISSED_GRACE), reminders
+still pending at shutdown fire after it, deleted tasks never fire, two
+engines on the same database never send one reminder twice, reminders
+claimed but not yet sent when the engine stops mid-batch fire after the
+restart, and another restart repeats nothing. Exits non-zero on the first failed check; takes
+a few seconds.
+
+    python benchmarks/check_reminders.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["LIFEBRAIN_DB"] = os.path.join(tempfile.mkdtemp(prefix="lifebrain-check-"), "reminders.db")
+
+from utils import datastore  # noqa: E402
+from utils.db import add_task, delete_task, init_db  # noqa: E402
+from utils.reminders import ReminderEngine, REMINDER_MISSED_GRACE  # noqa: E402
+
+sent = Counter()  # reminder text -> times sent
+
+
+async def send(user_id, text):
+    sent[text] += 1
+
+
+send_lock = asyncio.Lock()
+
+
+async def slow_send(user_id, text):
+    """About 100 messages/s, one at a time, like the rate-limited dispatcher."""
+    async with send_lock:
+        await asyncio.sleep(0.01)
+        sent[text] += 1
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAIL: {message}")
+    print(f"ok: {message}")
+
+
+def insert_reminders(rows):
+    datastore.write(lambda conn: conn.executemany(
+        "INSERT INTO tasks (user_id, task, time, due_at) VALUES (?, ?, ?, ?)", rows
+    ))
+
+
+def fired(prefix):
+    return {text: count for text, count in sent.items() if text.startswith(prefix)}
+
+
+async def run_engine(seconds, engines=1, send=send):
+    running = [ReminderEngine(send) for _ in range(engines)]
+    for engine in running:
+        await engine.start()
+    await asyncio.sleep(seconds)
+    for engine in running:
+        await engine.stop()
+
+
+async def run():
+    init_db()
+    now = int(time.time())
+    insert_reminders([(1, f"missed {i}", "00:00", now - 30) for i in range(5)])
+    insert_reminders([(1, f"stale {i}", "00:00", now - REMINDER_MISSED_GRACE - 60) for i in range(3)])
+    insert_reminders([(2, f"later {i}", "00:00", now + 2) for i in range(5)])
+    await add_task(3, "deleted", "00:00", now + 2)
+
+    await run_engine(0.3)
+    check(len(fired("missed")) == 5, "reminders missed within the grace period fire on startup")
+    check(not fired("stale"), "reminders missed beyond REMINDER_MISSED_GRACE are dropped")
+    check(not fired("later"), "reminders not yet due wait")
+
+    # bot is down: the pending ones fall due, one task is deleted, more are added
+    insert_reminders([(4, f"while down {i}", "00:00", now + 1) for i in range(3)])
+    check(await delete_task(3, 1), "a pending task can be deleted")
+    await asyncio.sleep(max(0.0, now + 2.2 - time.time()))
+
+    await run_engine(0.5)
+    check(len(fired("later")) == 5, "reminders pending at shutdown fire after the restart")
+    check(len(fired("while down")) == 3, "reminders stored while the bot was down fire after the restart")
+    check(not fired("deleted"), "deleted tasks never fire")
+
+    due = int(time.time()) + 1
+    insert_reminders([(5, f"shared {i}", "00:00", due) for i in range(20)])
+    await run_engine(max(0.5, due + 0.5 - time.time()), engines=2)
+    check(len(fired("shared")) == 20, "two engines on one database send every reminder")
+
+    insert_reminders([(6, f"slow {i}", "00:00", int(time.time()) - 5) for i in range(100)])
+    await run_engine(0.3, send=slow_send)
+    check(0 < len(fired("slow")) < 100, f"stopping in the middle of a batch stops sending ({len(fired('slow'))} of 100 sent)")
+    await run_engine(2.0, send=slow_send)
+    check(len(fired("slow")) == 100, "reminders claimed but not sent when the engine stopped fire after the restart")
+
+    await run_engine(0.5)
+    check(all(count == 1 for count in sent.values()), f"each of {len(sent)} reminders was sent exactly once")
+    datastore.close()
+    print("all reminder checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
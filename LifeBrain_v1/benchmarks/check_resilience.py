@@ -0,0 +1,148 @@
+# benchmarks/check_resilience.py
+"""
+Offline check of the upstream circuit breaker and hedged GETs
+(utils/http_client.py) through /weather, against the fault-injecting stubs
+in benchmarks/stubs.py: BREAKER_FAILURES errors in a row open the circuit,
+an open circuit answers at once from the last known report (or says the
+service is unavailable) without calling the upstream, after
+BREAKER_COOLDOWN exactly one probe goes through while half-open, a failed
+probe reopens the circuit and a successful one closes it, and hedged
+second requests stay within HTTP_HEDGE_BUDGET while cutting the tail.
+Exits non-zero on the first failed check; takes a few seconds.
+
+    python benchmarks/check_resilience.py
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ.update(stubs.env_for("127.0.0.1", PORT))
+# every call goes upstream; the cache only supplies degraded answers
+os.environ.update({"WEATHER_CACHE_TTL": "0", "WEATHER_CACHE_STALE": "0", "BREAKER_COOLDOWN": "1",
+                   "BREAKER_FAILURES": "5", "HTTP_HEDGE": "0", "HTTP_HEDGE_BUDGET": "0.1"})
+
+from utils import http_client  # noqa: E402
+from utils.http_client import CLOSED, HALF_OPEN, OPEN  # noqa: E402
+from utils.weather import get_weather  # noqa: E402
+
+DEGRADED = "showing the last known report"
+UNAVAILABLE = "Weather service is unavailable right now"
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"FAIL: {message}")
+    print(f"ok: {message}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def timed(city):
+    start = time.perf_counter()
+    text = await get_weather(city)
+    return text, time.perf_counter() - start
+
+
+async def check_breaker(stub, breaker):
+    for i in range(30):
+        text, _ = await timed("warm")
+    check(breaker.state == CLOSED and "Weather in" in text, "a healthy upstream keeps the circuit closed")
+    check(breaker.timeout() < http_client.HTTP_TIMEOUT,
+          f"the timeout adapts to observed latency ({breaker.timeout() * 1000:.0f} ms)")
+
+    stub.inject("weather", error_rate=1.0, status=503)
+    states = []
+    for i in range(http_client.BREAKER_FAILURES):
+        text, _ = await timed("warm")
+        states.append(breaker.state)
+    check(states == [CLOSED] * (http_client.BREAKER_FAILURES - 1) + [OPEN],
+          f"{http_client.BREAKER_FAILURES} failures in a row open the circuit")
+    check(DEGRADED in text, "a failed call answers from the last known report")
+
+    # open: no upstream call, answered at once even if the upstream would hang
+    stub.inject("weather", latency=5, error_rate=1.0, status=503)
+    before, short_circuits = stub.calls["weather"], breaker.short_circuits
+    cached, cached_s = await timed("warm")
+    missing, missing_s = await timed("never fetched")
+    check(stub.calls["weather"] == before and breaker.short_circuits == short_circuits + 2,
+          "an open circuit fails fast without calling the upstream")
+    check(DEGRADED in cached and max(cached_s, missing_s) < 0.1,
+          f"an open circuit answers from the cache at once ({cached_s * 1000:.1f} ms)")
+    check(UNAVAILABLE in missing, "an open circuit with nothing cached says the service is unavailable")
+
+    # half-open: one probe; the upstream still hangs, so the probe times out and fails
+    await asyncio.sleep(http_client.BREAKER_COOLDOWN)
+    probe = asyncio.ensure_future(get_weather("warm"))
+    await asyncio.sleep(0.05)
+    check(breaker.state == HALF_OPEN, "after BREAKER_COOLDOWN the circuit is half-open")
+    others = await asyncio.gather(*(timed("warm") for _ in range(10)))
+    check(stub.calls["weather"] == before + 1 and all(DEGRADED in text for text, _ in others),
+          "a half-open circuit lets exactly one probe through and fails the rest fast")
+    await probe
+    check(breaker.state == OPEN, "a failed probe reopens the circuit")
+
+    stub.heal("weather")
+    await asyncio.sleep(http_client.BREAKER_COOLDOWN)
+    text, _ = await timed("warm")
+    check(breaker.state == CLOSED and "Weather in" in text and DEGRADED not in text,
+          "a successful probe closes the circuit")
+
+
+async def tail(calls):
+    latencies = [(await timed(f"city{i % 20}"))[1] for i in range(calls)]
+    return percentile(latencies, 0.99)
+
+
+async def check_hedging(stub, calls=400):
+    breaker = http_client.get_breaker("openweather")
+    stub.inject("weather", latency=0.3, slow_rate=0.03)
+    plain = await tail(calls)
+    http_client.HTTP_HEDGE = True
+    hedged = await tail(calls)
+    check(hedged < plain / 2,
+          f"hedging cuts the tail when a few responses are slow (p99 {plain * 1000:.0f} -> {hedged * 1000:.0f} ms)")
+
+    # far more slow responses than the budget allows hedges for: the budget binds
+    http_client.breakers.clear()
+    http_client.HTTP_HEDGE_BUDGET = 0.02
+    stub.inject("weather", latency=0.05, slow_rate=0.3)
+    await tail(calls)
+    breaker = http_client.get_breaker("openweather")
+    http_client.HTTP_HEDGE = False
+    stub.heal("weather")
+    check(0 < breaker.hedges <= http_client.HTTP_HEDGE_BUDGET * breaker.calls + 1,
+          f"hedged requests stay within HTTP_HEDGE_BUDGET ({breaker.hedges} of {breaker.calls} calls)")
+
+
+async def run():
+    stub, stop = await stubs.start_stubs("127.0.0.1", PORT, upstream_latency=0.005)
+    breaker = http_client.get_breaker("openweather")
+    try:
+        await check_breaker(stub, breaker)
+        await check_hedging(stub)
+    finally:
+        await stop()
+        await http_client.close_clients()
+    print("all resilience checks passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
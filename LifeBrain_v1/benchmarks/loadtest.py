@@ -0,0 +1,255 @@
+# benchmarks/loadtest.py
+"""
+End-to-end load test: builds the real Application from main.py against the
+offline stubs in benchmarks/stubs.py, replays a synthetic update stream
+through the same update processor PTB uses, and reports throughput,
+p50/p95/p99 latency per command (from update arrival until its handler,
+replies included, has finished) and memory.
+
+    python benchmarks/loadtest.py --users 500 --updates 5000 --shape burst \\
+        --mix solve=3,weather=2,news=1,translate=1,addtask=1,showtasks=2,chat=2,button=1 \\
+        --out results/loadtest.json
+
+Compare runs across commits by diffing the JSON files. By default the
+outbound rate limits are lifted so the bot itself is measured; pass
+--telegram-limits to keep the real ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BULK_LINES = 10
+DEFAULT_MIX = "solve=3,weather=2,news=1,translate=1,addtask=1,showtasks=2,chat=2,button=1,start=1"
+CITIES = ["chennai", "london", "paris", "tokyo", "new york", "berlin", "madrid", "cairo", "lima", "oslo"]
+CURRENCIES = ["usd eur", "eur gbp", "inr usd", "jpy chf", "gbp inr"]
+TOPICS = ["ai", "python", "space", "climate", "football"]
+PHRASES = ["hola amigo", "bonjour tout le monde", "guten morgen", "buongiorno", "ciao bella"]
+CHATS = ["hi there", "how are you?", "who are you", "tell me something", "bye"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="command=weight,... (chat = plain text, button = callback, "
+                             "bulkadd = /addtask with BULK_LINES lines)")
+    parser.add_argument("--shape", choices=["steady", "burst", "spike"], default="steady",
+                        help="steady: --rate updates/s; burst: --burst-size at once, averaging --rate; spike: all at t=0")
+    parser.add_argument("--rate", type=float, default=500.0)
+    parser.add_argument("--burst-size", type=int, default=200)
+    parser.add_argument("--upstream-latency", type=float, default=0.02, help="seconds added by weather/news/translate stubs")
+    parser.add_argument("--bot-latency", type=float, default=0.005, help="seconds added by the fake Bot API")
+    parser.add_argument("--telegram-limits", action="store_true", help="keep the real outbound rate limits")
+    parser.add_argument("--ai-chat", action="store_true",
+                        help="answer chat through the streaming completion stub instead of the offline intents")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="", help="write results as JSON to this path")
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return 0
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def make_update(update_id, user_id, command, rng):
+    sender = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    chat = {"id": user_id, "type": "private"}
+    if command == "button":
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": sender, "chat_instance": str(user_id),
+            "data": rng.choice(["show_tasks", "solve_help", "weather_help", "news_help"]),
+        }}
+    if command == "chat":
+        text = rng.choice(CHATS)
+    elif command == "bulkadd":
+        # a pasted plan: one /addtask with BULK_LINES tasks
+        text = "/addtask\n" + "\n".join(
+            f"task {update_id}.{i} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}" for i in range(BULK_LINES)
+        )
+    else:
+        arg = {
+            "solve": f"{rng.randint(1, 999)}*({rng.randint(1, 99)}+{rng.randint(1, 9)})",
+            "weather": rng.choice(CITIES),
+            "news": rng.choice(TOPICS),
+            "translate": rng.choice(PHRASES),
+            "convert": f"{rng.randint(1, 999)} {rng.choice(CURRENCIES)}",
+            "addtask": f"task {update_id} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+            "deletetask": "1",
+            "daily": f"{rng.randint(0, 23)}:{rng.randint(0, 59):02d}",
+        }.get(command, "")
+        text = f"/{command} {arg}".strip()
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": sender, "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def schedule(args):
+    """Offsets (seconds from start) at which each update is injected."""
+    if args.shape == "spike":
+        return [0.0] * args.updates
+    if args.shape == "burst":
+        gap = args.burst_size / args.rate
+        return [(i // args.burst_size) * gap for i in range(args.updates)]
+    return [i / args.rate for i in range(args.updates)]
+
+
+async def run(args):
+    import main
+    from telegram import Update
+    from utils.metrics import HANDLER_ERRORS
+
+    rng = random.Random(args.seed)
+    mix = [(name, float(weight)) for name, weight in (item.split("=") for item in args.mix.split(","))]
+    commands = rng.choices([name for name, _ in mix], weights=[w for _, w in mix], k=args.updates)
+    users = [100000 + i for i in range(args.users)]
+    payloads = [make_update(i + 1, rng.choice(users), command, rng) for i, command in enumerate(commands)]
+
+    app = main.build_app(port=0)
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+
+    latencies = defaultdict(list)
+
+    async def handle(update, command, arrived):
+        # what PTB's update fetcher does for each update, timed
+        await app.update_processor.process_update(update, app.process_update(update))
+        latencies[command].append(time.perf_counter() - arrived)
+
+    rss_before = rss_kib()
+    offsets = schedule(args)
+    tasks = []
+    start = time.perf_counter()
+    for payload, command, offset in zip(payloads, commands, offsets):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = Update.de_json(payload, app.bot)
+        tasks.append(asyncio.create_task(handle(update, command, time.perf_counter())))
+    await asyncio.gather(*tasks)
+    # replies are awaited by the handlers; anything left is background sends
+    while main.dispatcher.queue_depth():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    rss_after = rss_kib()
+
+    await app.stop()
+    await app.shutdown()
+    await app.post_shutdown(app)
+
+    def summary(values):
+        return {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+        }
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "updates": args.updates,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(args.updates / elapsed, 1),
+        "latency": summary(everything),
+        "latency_by_command": {command: summary(values) for command, values in sorted(latencies.items())},
+        "handler_errors": {labels[0]: value for labels, value in HANDLER_ERRORS.values().items() if value},
+        "messages": main.dispatcher.stats(),
+        "memory_kib": {
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+
+
+async def run_with_stubs(args, port):
+    import stubs
+
+    stub_server, stop = await stubs.start_stubs("127.0.0.1", port, args.upstream_latency, args.bot_latency)
+    try:
+        result = await run(args)
+    finally:
+        await stop()
+    result["stub_calls"] = dict(stub_server.calls)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main_cli():
+    args = parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import stubs
+
+    # main.py reads its configuration at import time, so set it up first
+    port = free_port()
+    tmp_dir = tempfile.mkdtemp(prefix="lifebrain-loadtest-")
+    os.environ.update(stubs.env_for("127.0.0.1", port))
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "123456:LOADTEST",
+        "LIFEBRAIN_DB": os.path.join(tmp_dir, "loadtest.db"),
+        "LOG_DIR": tmp_dir,
+        "METRICS_PORT": "0",
+        "OPENAI_KEY": "stub" if args.ai_chat else "",
+    })
+    if not args.telegram_limits:
+        os.environ.update({"SEND_GLOBAL_RATE": "1000000", "SEND_CHAT_RATE": "1000000", "SEND_CHAT_BURST": "1000000"})
+
+    result = asyncio.run(run_with_stubs(args, port))
+    result = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        **result,
+    }
+    print(json.dumps({k: result[k] for k in ("throughput_per_s", "latency", "memory_kib", "handler_errors")}, indent=2))
+    for command, stats in result["latency_by_command"].items():
+        print(f"  {command:<11} n={stats['count']:<6} p50={stats['p50_ms']:>8} ms  "
+              f"p95={stats['p95_ms']:>8} ms  p99={stats['p99_ms']:>8} ms")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,239 @@
+# benchmarks/stubs.py
+"""
+Offline stand-ins for every external service the bot talks to, served as
+one ASGI app on a local port:
+
+    /bot<token>/<method>   fake Telegram Bot API (getMe, sendMessage, ...)
+    /weather               OpenWeather current weather
+    /news                  NewsAPI /v2/everything
+    /translate             MyMemory /get
+    /rates                 exchangerate.host /latest
+    /chat/completions      OpenAI chat completions, streamed as server-sent events
+
+Faults can be injected per service (latency, error responses, Bot API
+flood waits), from code with Stubs.inject() or over HTTP:
+
+    curl -X POST localhost:8799/_faults -d '{"weather": {"latency": 5}, "news": {"error_rate": 1}}'
+    curl -X POST localhost:8799/_faults -d '{"bot": {"error_rate": 1, "status": 429, "retry_after": 2, "times": 3}}'
+
+Point the bot at it with TELEGRAM_BASE_URL=http://HOST:PORT/bot,
+OPENWEATHER_URL, NEWS_API_URL, MYMEMORY_URL, EXCHANGE_RATES_URL and
+OPENAI_BASE_URL (see env_for()); AI chat also needs OPENAI_KEY set.
+
+    python benchmarks/stubs.py [port]      # run standalone
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.webhook import serve  # noqa: E402
+
+BOT_USER = {
+    "id": 1, "is_bot": True, "first_name": "LifeBrain", "username": "lifebrain_stub_bot",
+    "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False,
+}
+
+
+# units per 1 USD
+RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "INR": 83.2, "JPY": 149.5, "AUD": 1.52, "CAD": 1.36, "CHF": 0.88}
+
+
+def env_for(host, port):
+    """Environment variables that point the bot at stubs running on host:port."""
+    base = f"http://{host}:{port}"
+    return {
+        "TELEGRAM_BASE_URL": f"{base}/bot",
+        "OPENWEATHER_URL": f"{base}/weather",
+        "NEWS_API_URL": f"{base}/news",
+        "MYMEMORY_URL": f"{base}/translate",
+        "EXCHANGE_RATES_URL": f"{base}/rates",
+        "OPENAI_BASE_URL": base,
+        "OPENWEATHER_API_KEY": "stub",
+        "NEWS_API_KEY": "stub",
+    }
+
+
+class Stubs:
+    """ASGI app answering like the real services, with optional added latency."""
+
+    def __init__(self, upstream_latency=0.0, bot_latency=0.0, token_interval=0.0):
+        self.upstream_latency = upstream_latency
+        self.bot_latency = bot_latency
+        self.token_interval = token_interval  # seconds between streamed completion chunks
+        self.completions = []   # "messages" of every chat completion request, in order
+        self.sent = []          # (monotonic time, chat_id, text) of every sendMessage answered
+        self.calls = Counter()  # "bot.sendMessage", "weather", ... -> count
+        self.faults = {}        # service name -> {"latency": s, "slow_rate": 0..1, "error_rate": 0..1, "status": code}
+        self._message_id = 0
+        self._rng = random.Random(1)
+
+    def inject(self, name, latency=0.0, slow_rate=1.0, error_rate=0.0, status=503, retry_after=1, times=0):
+        """
+        Make `name` ("weather", "news", "translate", "rates", "chat/completions"
+        or "bot") slow (`latency` added to a `slow_rate` fraction of calls)
+        and/or failing with `status`; "bot" answers 429s like Telegram, asking
+        to retry after `retry_after` seconds. With `times` the fault heals
+        itself after that many errors.
+        """
+        self.faults[name] = {"latency": latency, "slow_rate": slow_rate, "error_rate": error_rate, "status": status,
+                             "retry_after": retry_after, "times": times}
+
+    def heal(self, name=None):
+        """Remove the faults of `name`, or of every service."""
+        if name is None:
+            self.faults.clear()
+        else:
+            self.faults.pop(name, None)
+
+    async def _apply_fault(self, name, send):
+        """Sleep and/or answer with an error as configured; True if the response was sent."""
+        fault = self.faults.get(name)
+        if not fault:
+            return False
+        if fault.get("latency") and self._rng.random() < fault.get("slow_rate", 1.0):
+            await asyncio.sleep(fault["latency"])
+        if self._rng.random() < fault.get("error_rate", 0.0):
+            status = fault.get("status", 503)
+            if fault.get("times"):
+                fault["times"] -= 1
+                if not fault["times"]:
+                    self.heal(name)
+            payload = {"error": "injected fault"}
+            if name == "bot":
+                payload = {"ok": False, "error_code": status, "description": "injected fault"}
+            if name == "bot" and status == 429:
+                retry_after = fault.get("retry_after", 1)
+                payload.update(description=f"Too Many Requests: retry after {retry_after}",
+                               parameters={"retry_after": retry_after})
+            await _json(send, payload, status=status)
+            return True
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        params = {k: v[0] for k, v in parse_qs(scope["query_string"].decode()).items()}
+        params.update(_parse_body(dict(scope["headers"]).get(b"content-type", b""), body))
+
+        path = scope["path"]
+        if path == "/_faults":
+            if scope["method"] == "POST":
+                self.faults = {name: dict(fault) for name, fault in json.loads(body or b"{}").items()}
+            return await _json(send, self.faults)
+        if path.startswith("/bot"):
+            method = path.rsplit("/", 1)[-1]
+            self.calls[f"bot.{method}"] += 1
+            if self.bot_latency:
+                await asyncio.sleep(self.bot_latency)
+            if await self._apply_fault("bot", send):
+                return
+            result = self._bot_result(method, params)
+            return await _json(send, {"ok": True, "result": result})
+
+        name = path.strip("/")
+        self.calls[name] += 1
+        if self.upstream_latency:
+            await asyncio.sleep(self.upstream_latency)
+        if await self._apply_fault(name, send):
+            return
+        if name == "weather":
+            return await _json(send, {
+                "cod": 200, "name": params.get("q", ""),
+                "weather": [{"description": "clear sky"}], "main": {"temp": 24.5, "humidity": 40},
+            })
+        if name == "news":
+            size = int(params.get("pageSize", 3))
+            articles = [{"title": f"{params.get('q', '')} headline {i}", "url": f"https://example.com/{i}"}
+                        for i in range(size)]
+            return await _json(send, {"status": "ok", "totalResults": size, "articles": articles})
+        if name == "translate":
+            text = params.get("q", "")
+            return await _json(send, {"responseStatus": 200, "responseData": {"translatedText": f"[en] {text}"}})
+        if name == "rates":
+            base = params.get("base", "USD")
+            rates = {code: rate / RATES[base] for code, rate in RATES.items()}
+            return await _json(send, {"success": True, "base": base, "date": time.strftime("%Y-%m-%d"), "rates": rates})
+        if name == "chat/completions":
+            return await self._completion(params.get("messages", []), send)
+        await _json(send, {"error": "not found"}, status=404)
+
+    async def _completion(self, messages, send):
+        """Stream an answer that echoes the prompt and says how many earlier turns it was given."""
+        self.completions.append(messages)
+        prompt = messages[-1]["content"] if messages else ""
+        context = sum(1 for m in messages[:-1] if m["role"] != "system")
+        words = f"You said: {prompt} ({context} earlier messages)".split(" ")
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        for i, word in enumerate(words):
+            delta = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(delta)}\n\n".encode(),
+                        "more_body": True})
+            if self.token_interval:
+                await asyncio.sleep(self.token_interval)
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    def _bot_result(self, method, params):
+        if method == "getMe":
+            return BOT_USER
+        if method in ("sendMessage", "editMessageText"):
+            self._message_id += 1
+            chat_id = int(params.get("chat_id", 0))
+            if method == "sendMessage":
+                self.sent.append((time.monotonic(), chat_id, params.get("text", "")))
+            return {
+                "message_id": int(params.get("message_id", self._message_id)), "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "from": BOT_USER, "text": params.get("text", ""),
+            }
+        return True
+
+
+def _parse_body(content_type, body):
+    if not body:
+        return {}
+    if content_type.startswith(b"application/json"):
+        data = json.loads(body)
+        return data if isinstance(data, dict) else {}
+    if content_type.startswith(b"multipart/"):
+        return {}
+    return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+
+async def _json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def start_stubs(host, port, upstream_latency=0.0, bot_latency=0.0, token_interval=0.0):
+    """Start the stubs in the running loop. Returns (stubs, stop) where `stop()` shuts them down."""
+    stubs = Stubs(upstream_latency, bot_latency, token_interval)
+    stop_event = asyncio.Event()
+    task = asyncio.create_task(serve(stubs, host, port, stop_event))
+    await asyncio.sleep(0.1)  # let the server bind
+
+    async def stop():
+        stop_event.set()
+        await task
+
+    return stubs, stop
+
+
+if __name__ == "__main__":
+    stub_port = int(sys.argv[1]) if len(sys.argv) > 1 else 8799
+    print(json.dumps(env_for("127.0.0.1", stub_port), indent=2))
+    asyncio.run(serve(Stubs(), "127.0.0.1", stub_port, asyncio.Event()))
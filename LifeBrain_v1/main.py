@@ -1,66 +1,193 @@
 # main.py
+# Importing this module only defines things: no network, database, threads or
+# app. Utility modules are imported where they are first needed; build_app()
+# creates the Application and the lifecycle hooks start everything else.
+import time
+_import_started = time.perf_counter()
+
 import asyncio
 import os
 import re
-import random
+import sys
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler,
     ContextTypes, CallbackQueryHandler, filters
 )
-from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
 
-# --- Load environment variables ---
+# --- Load environment variables (utils read theirs when imported) ---
 load_dotenv()
 
-# Fix for Windows event loop (safe guard)
-try:
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-except Exception:
-    pass
-
-# --- Import utility modules (your existing utils) ---
-from utils.solver import solve_expression
-from utils.translator import translate_text
-from utils.weather import get_weather
-from utils.news import get_news
-from utils.db import init_db, add_task, get_tasks, delete_task
-from utils.memory import init_memory
-from utils.daily_summary import get_daily_summary
-
-# --- Telegram Token ---
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
-if not TELEGRAM_TOKEN:
-    raise RuntimeError("❌ TELEGRAM_BOT_TOKEN missing. Add TELEGRAM_BOT_TOKEN to your .env file.")
+from utils.dispatcher import Dispatcher, INTERACTIVE, BULK, SEND_GLOBAL_RATE
+from utils.logger import logger, setup_logging
+from utils.metrics import METRICS_PORT, Counter, Gauge, instrument_handler, start_metrics_server
 
-app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+# --- Telegram Token (checked by build_app) ---
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
+# Optional: point the bot at a local (or fake) Bot API server
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "").strip()
+
+# "polling" (default) or "webhook" (see utils/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+
+# Startup phases in order, name -> seconds; logged once the bot is ready
+startup_timings = {}
+_phase_started = _import_started
+
+def _require_token():
+    if not TELEGRAM_TOKEN:
+        raise RuntimeError("❌ TELEGRAM_BOT_TOKEN missing. Add TELEGRAM_BOT_TOKEN to your .env file.")
+
+def _mark(phase):
+    """Record the time since the previous mark as `phase`."""
+    global _phase_started
+    now = time.perf_counter()
+    startup_timings[phase] = now - _phase_started
+    _phase_started = now
+
+async def on_startup(application):
+    global metrics_server
+    from utils import profiler
+    from utils.db import init_db
+    from utils.memory import init_memory
+    from utils.intents import get_engine
+
+    _mark("initialize")  # Application.initialize(): Bot API getMe
+    init_db()
+    init_memory()
+    _mark("database")
+    get_engine()  # compile the chat intents once, before the first message
+    _mark("intents")
+    await profiler.start()
+    metrics_server = await start_metrics_server(metrics_port)
+    await dispatcher.start()
+    await reminder_engine.start()
+    if owns_scheduler:
+        # first tick just after the next minute boundary
+        application.job_queue.run_repeating(summary_tick, interval=60, first=61 - datetime.now().second)
+    _mark("scheduler")
+    logger.info(
+        "Startup: %s; ready %.0f ms after import began",
+        ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in startup_timings.items()),
+        sum(startup_timings.values()) * 1000,
+    )
 
-scheduler = BackgroundScheduler()
-scheduler.start()
+async def on_shutdown(application):
+    from utils.http_client import close_clients
+    from utils import datastore, profiler
+
+    if metrics_server is not None:
+        metrics_server.close()
+    await profiler.stop()
+    await reminder_engine.stop()
+    await dispatcher.stop()
+    await close_clients()
+    await datastore.flush_writes()
+    if "utils.solver" in sys.modules:
+        sys.modules["utils.solver"].shutdown_pool()
+    datastore.close()
+
+# Every outgoing message goes through one rate-limited queue (global + per chat);
+# build_app() attaches the bot
+dispatcher = Dispatcher()
+
+# Scheduled jobs run as coroutines on the application's loop (PTB JobQueue) and
+# share app.bot; this caps how many of them talk to Telegram/upstreams at once.
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "50"))
+job_semaphore = asyncio.Semaphore(JOB_CONCURRENCY)
 
 # -----------------------
 # Helpers
 # -----------------------
-def format_tasks_text(user_id: int) -> str:
-    """Return formatted tasks message for a user id."""
-    tasks = get_tasks(user_id)
-    if not tasks:
-        return "🗓️ No tasks yet! Use /addtask <task> <HH:MM> to add one."
-    # tasks expected to be list of (task, time) tuples
-    lines = [f"{i+1}. {t[0]} — ⏰ {t[1]}" for i, t in enumerate(tasks)]
-    return "📋 <b>Your Tasks:</b>\n" + "\n".join(lines)
-
-def schedule_reminder(application, user_id, message, when):
-    async def send_reminder():
+async def reply(update: Update, text, **kwargs):
+    """Reply to the update's message through the dispatcher's interactive lane."""
+    return await dispatcher.submit(
+        update.effective_chat.id, update.message.reply_text, text, priority=INTERACTIVE, **kwargs
+    )
+
+TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", "10"))
+
+async def tasks_page(user_id, cursor=0, start=1, before=False, version=None):
+    """
+    Return one /showtasks page as (text, reply_markup). Pages seek by task id
+    and the buttons carry the number of the page's first task, so numbering
+    matches /deletetask without counting rows. They also carry the version of
+    the task list they were rendered from; a button pressed after the tasks
+    changed (`version` outdated) shows page 1 again. Rendered pages are cached
+    per user until the user's tasks change (see utils/db.py).
+    """
+    from utils.db import TASK_PAGES_PER_USER, cached_task_pages, task_version
+
+    if version is not None and version != task_version(user_id):
+        cursor, start, before = 0, 1, False
+    pages = await cached_task_pages(user_id)
+    key = (cursor, start, before)
+    page = pages.get(key)
+    if page is None:
+        page = await _render_tasks_page(user_id, cursor, start, before)
+        if len(pages) < TASK_PAGES_PER_USER:
+            pages[key] = page
+    return page
+
+async def _render_tasks_page(user_id, cursor, start, before):
+    from utils.db import get_tasks_page, task_version
+
+    # read before the rows: a change in between leaves the buttons outdated, never wrong
+    version = task_version(user_id)
+    rows, more = await get_tasks_page(user_id, cursor, TASKS_PAGE_SIZE, before)
+    if not rows:
+        if cursor:  # paged past the end after deletions: back to the start
+            return await _render_tasks_page(user_id, 0, 1, False)
+        return "🗓️ No tasks yet! Use /addtask <task> <HH:MM> to add one.", None
+    if before and not more:
+        start = 1
+    has_prev, has_next = (more, True) if before else (start > 1, more)
+
+    lines = [f"{start + i}. {task} — ⏰ {time_str}" for i, (_, task, time_str) in enumerate(rows)]
+    header = "📋 <b>Your Tasks:</b>"
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton(
+            "◀️ Prev", callback_data=f"tasks:p:{version}:{rows[0][0]}:{max(1, start - TASKS_PAGE_SIZE)}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton(
+            "Next ▶️", callback_data=f"tasks:n:{version}:{rows[-1][0]}:{start + len(rows)}"))
+    if buttons:
+        header += f" ({start}–{start + len(rows) - 1})"
+    return header + "\n" + "\n".join(lines), InlineKeyboardMarkup([buttons]) if buttons else None
+
+async def send_reminder(user_id, message):
+    async with job_semaphore:
         try:
-            await application.bot.send_message(chat_id=user_id, text=f"⏰ Reminder: {message}")
+            await dispatcher.send_message(user_id, f"⏰ Reminder: {message}", priority=BULK)
         except Exception as e:
-            print(f"Reminder failed: {e}")
-
-    # APScheduler will call the lambda at the run_date
-    scheduler.add_job(lambda: asyncio.run(send_reminder()), 'date', run_date=when)
+            logger.warning("Reminder to %s failed: %s", user_id, e)
+
+# Reminders live in SQLite (tasks.due_at); the engine fires them and survives restarts.
+# Set by build_app(): a ReminderEngine, or a ReminderForwarder in webhook
+# workers that don't own the scheduler.
+reminder_engine = None
+# False in webhook workers other than the one running reminders and summaries
+owns_scheduler = True
+update_processor = None
+metrics_port = METRICS_PORT
+metrics_server = None
+
+# Queue depths and delivery counters, read when /metrics is scraped
+Gauge("lifebrain_send_queue_depth", "Outbound messages waiting in the dispatcher",
+      collect=lambda: dispatcher.queue_depth())
+Gauge("lifebrain_reminders_loaded", "Reminders held by the reminder engine for the current window",
+      collect=lambda: len(reminder_engine) if reminder_engine is not None else 0)
+Gauge("lifebrain_updates_waiting", "Updates waiting for their user's previous update or a free slot",
+      collect=lambda: update_processor.waiting() if update_processor is not None else 0)
+Counter("lifebrain_messages_total", "Outbound messages by outcome", ["result"],
+        collect=lambda: {("sent",): dispatcher.sent, ("failed",): dispatcher.failed,
+                         ("retried",): dispatcher.retries, ("flood_wait",): dispatcher.flood_waits})
+Counter("lifebrain_reminders_fired_total", "Reminders sent by the reminder engine",
+        collect=lambda: getattr(reminder_engine, "fired", 0))
 
 # ==============================
 # /start
@@ -87,7 +214,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• /daily 09:00"
     )
     # reply to the user who started the bot
-    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML")
+    await reply(update, text, reply_markup=reply_markup, parse_mode="HTML")
 
 # ==============================
 # /help
@@ -97,12 +224,13 @@ HELP_TEXT = (
     "🧮 /solve <expr> — Calculate expressions\n"
     "🗣 /translate <text> — Translate text\n"
     "🌦 /weather <city> — Weather updates\n"
+    "💱 /convert <amount> <from> <to> — Currency conversion\n"
     "📰 /news <topic> — Latest headlines\n"
-    "🗓 /addtask <task> <HH:MM> — Add tasks\n"
+    "🗓 /addtask <task> <HH:MM> — Add tasks (one per line for several)\n"
     "📋 /showtasks — View tasks\n"
     "🌅 /daily <HH:MM> — Daily summary\n"
     "🗑 /deletetask <number> — Delete a task manually\n"
-    "💬 Just type anything — Chat with AI (offline mode)"
+    "💬 Just type anything — Chat with AI (offline mode unless OPENAI_KEY is set)"
 )
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -117,190 +245,278 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # answer the callback (removes spinner)
         await q.answer()
         # send help as a new message to the user (so original inline menu remains)
-        await context.bot.send_message(chat_id=q.from_user.id, text=HELP_TEXT, parse_mode="HTML")
+        await dispatcher.send_message(q.from_user.id, HELP_TEXT, priority=INTERACTIVE, parse_mode="HTML")
         return
 
     # else normal message-based /help
-    await update.message.reply_text(HELP_TEXT, parse_mode="HTML")
+    await reply(update, HELP_TEXT, parse_mode="HTML")
 
 # ==============================
 # /solve
 # ==============================
 async def solve(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text("Usage: /solve 24*(5/3)")
+        await reply(update, "Usage: /solve 24*(5/3)")
         return
+    from utils.solver import solve_expression
+
     expr = " ".join(context.args)
     try:
-        result = solve_expression(expr)
+        result = await solve_expression(expr)
     except Exception as e:
         result = f"⚠️ Error computing expression: {e}"
-    await update.message.reply_text(f"🧮 Result: {result}")
+    await reply(update, f"🧮 Result: {result}")
 
 # ==============================
 # /translate
 # ==============================
 async def translate(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text("Usage: /translate hola amigo")
+        await reply(update, "Usage: /translate hola amigo")
         return
+    from utils.translator import translate_text
+
     text = " ".join(context.args)
     try:
-        translated = translate_text(text)
+        translated = await translate_text(text)
     except Exception as e:
         translated = f"⚠️ Translation error: {e}"
-    await update.message.reply_text(f"Translation: {translated}")
+    await reply(update, f"Translation: {translated}")
 
 # ==============================
 # /weather
 # ==============================
 async def weather(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text("Usage: /weather <city>")
+        await reply(update, "Usage: /weather <city>")
         return
+    from utils.weather import get_weather
+
     city = " ".join(context.args)
     try:
-        resp = get_weather(city)
+        resp = await get_weather(city)
     except Exception as e:
         resp = f"⚠️ Weather error: {e}"
-    await update.message.reply_text(resp)
+    await reply(update, resp)
 
 # ==============================
 # /news
 # ==============================
 async def news(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    from utils.news import get_news
+
     topic = " ".join(context.args) if context.args else "AI"
     try:
-        resp = get_news(topic)
+        resp = await get_news(topic)
     except Exception as e:
         resp = f"⚠️ News error: {e}"
-    await update.message.reply_text(resp)
+    await reply(update, resp)
 
 # ==============================
-# TASKS (add/show)
+# /convert
 # ==============================
-async def addtask(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if len(context.args) < 2:
-        await update.message.reply_text("Usage: /addtask <task> <time>\nExample: /addtask drink tea 13:30")
+async def convert(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = [a for a in context.args if a.lower() != "to"]
+    if len(args) != 3:
+        await reply(update, "Usage: /convert <amount> <from> <to>\nExample: /convert 100 usd eur")
         return
+    from utils.converter import convert_currency
 
-    task = " ".join(context.args[:-1])
-    time_str = context.args[-1]
-    now = datetime.now()
+    await reply(update, await convert_currency(*args))
+
+# ==============================
+# TASKS (add/show)
+# ==============================
+BULK_TASKS_MAX = int(os.getenv("BULK_TASKS_MAX", "100"))
+MESSAGE_LIMIT = 4096  # Telegram's maximum message length
+
+def parse_task_line(line, now):
+    """Parse "<task> <HH:MM>" into (task, time_str, due_at); raises ValueError with the reason."""
+    parts = line.split()
+    if len(parts) < 2:
+        raise ValueError("Expected <task> <HH:MM>.")
+    task, time_str = " ".join(parts[:-1]), parts[-1]
 
     # Validate HH:MM
     if not re.match(r"^\d{1,2}:\d{2}$", time_str):
-        await update.message.reply_text("❌ Invalid time format. Use HH:MM (24-hour).")
-        return
-
+        raise ValueError("Invalid time format. Use HH:MM (24-hour).")
     try:
         hour, minute = map(int, time_str.split(":"))
         task_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
         if task_time < now:
             task_time += timedelta(days=1)
     except Exception:
-        await update.message.reply_text("❌ Invalid time values. Use HH:MM.")
+        raise ValueError("Invalid time values. Use HH:MM.")
+    return task, time_str, int(task_time.timestamp())
+
+def _utf16_len(text):
+    # Telegram measures message length in UTF-16 code units
+    return len(text.encode("utf-16-le")) // 2
+
+def fit_lines(header, lines):
+    """`header` and one line per item, cut short with "…and N more" to fit one message."""
+    text = header
+    for shown, line in enumerate(lines):
+        # leave room for the "more" line in case a later one doesn't fit
+        if _utf16_len(text) + 1 + _utf16_len(line) > MESSAGE_LIMIT - 20:
+            return text + f"\n…and {len(lines) - shown} more"
+        text += "\n" + line
+    return text
+
+async def addtask(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if len(context.args) < 2:
+        await reply(update, "Usage: /addtask <task> <time>\nExample: /addtask drink tea 13:30\n"
+                            "Add several at once with one task per line.")
         return
 
-    add_task(update.effective_user.id, task, time_str)
-    await update.message.reply_text(f"✅ Task added: {task} at {time_str}")
-    schedule_reminder(context.application, update.effective_user.id, task, task_time)
+    # one "<task> <HH:MM>" per line of the raw text after the command
+    lines = [line for line in update.message.text.split(None, 1)[1].splitlines() if line.strip()]
+    if len(lines) > BULK_TASKS_MAX:
+        await reply(update, f"❌ At most {BULK_TASKS_MAX} tasks per message.")
+        return
+    now = datetime.now()
+    entries, errors = [], []
+    for number, line in enumerate(lines, 1):
+        try:
+            entries.append(parse_task_line(line, now))
+        except ValueError as e:
+            errors.append((number, e))
+    if len(lines) == 1 and errors:
+        await reply(update, f"❌ {errors[0][1]}")
+        return
+    if errors:
+        # all or nothing, so the corrected block can simply be sent again
+        await reply(update, fit_lines("❌ Nothing added, fix these lines:", [f"{n}: {e}" for n, e in errors]))
+        return
+
+    from utils.db import add_tasks
+
+    user_id = update.effective_user.id
+    task_ids = await add_tasks(user_id, entries)
+    # the tasks are stored: register their reminders before a reply can fail
+    reminder_engine.schedule_many(
+        [(due_at, task_id, user_id, task) for task_id, (task, _, due_at) in zip(task_ids, entries)]
+    )
+    if len(entries) == 1:
+        await reply(update, f"✅ Task added: {entries[0][0]} at {entries[0][1]}"[:MESSAGE_LIMIT])
+    else:
+        await reply(update, fit_lines(f"✅ Added {len(entries)} tasks:",
+                                      [f"• {task} at {time_str}" for task, time_str, _ in entries]))
 
 async def showtasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Works for both message and callback: prefer user id from callback_query if present
     user_id = update.effective_user.id
-    text = format_tasks_text(user_id)
+    text, markup = await tasks_page(user_id)
     # If called from callback, answer and send new message so inline keyboard isn't replaced
     if update.callback_query is not None:
         await update.callback_query.answer()
-        await context.bot.send_message(chat_id=user_id, text=text, parse_mode="HTML")
+        await dispatcher.send_message(user_id, text, priority=INTERACTIVE, parse_mode="HTML", reply_markup=markup)
         return
-    await update.message.reply_text(text, parse_mode="HTML")
+    await reply(update, text, parse_mode="HTML", reply_markup=markup)
 
 async def deletetask(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
-        await update.message.reply_text(
-            "Usage: /deletetask <task_number>\nExample: /deletetask 2"
+        await reply(
+            update, "Usage: /deletetask <task_number>\nExample: /deletetask 2"
         )
         return
 
     try:
         index = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("❌ Task number must be a number.")
+        await reply(update, "❌ Task number must be a number.")
         return
 
-    success = delete_task(update.effective_user.id, index)
+    from utils.db import delete_task
+
+    success = await delete_task(update.effective_user.id, index)
 
     if success:
-        await update.message.reply_text("✅ Task deleted successfully.")
+        await reply(update, "✅ Task deleted successfully.")
     else:
-        await update.message.reply_text("❌ Invalid task number.")
+        await reply(update, "❌ Invalid task number.")
 
 
 # ==============================
 # /daily summary
 # ==============================
-def schedule_daily_summary(application, user_id, hour=7, minute=0):
-    def send_summary():
-        summary = get_daily_summary(user_id)
-        asyncio.run(application.bot.send_message(chat_id=user_id, text=summary, parse_mode="HTML"))
+# Every user's slot lives in daily_summaries; one tick per minute fans out to
+# everyone due in that minute instead of one job per user.
+async def send_summary(user_id, summary):
+    async with job_semaphore:
+        try:
+            await dispatcher.send_message(user_id, summary, priority=BULK, parse_mode="HTML")
+        except Exception as e:
+            logger.warning("Daily summary to %s failed: %s", user_id, e)
+
+async def summary_tick(context: ContextTypes.DEFAULT_TYPE):
+    from utils.db import get_daily_summary_users, has_daily_summaries
+    from utils.news import NEWS_PREFETCH_LEAD, prefetch_news
+    from utils.daily_summary import run_daily_summaries
 
     now = datetime.now()
-    first_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    if first_time < now:
-        first_time += timedelta(days=1)
+    minute_of_day = now.hour * 60 + now.minute
+    prefetch_minutes = max(1, -(-NEWS_PREFETCH_LEAD // 60))
+
+    # Warm the news cache shortly before a window that has subscribers
+    if await has_daily_summaries((minute_of_day + prefetch_minutes) % (24 * 60)):
+        context.application.create_task(prefetch_news())
+
+    user_ids = await get_daily_summary_users(minute_of_day)
+    if user_ids:
+        # fan-out can outlast the minute; don't hold up the next tick
+        context.application.create_task(run_daily_summaries(user_ids, send_summary))
+
+async def schedule_daily_summary(user_id, hour=7, minute=0):
+    from utils.db import set_daily_summary
 
-    scheduler.add_job(send_summary, 'interval', days=1, next_run_time=first_time)
+    await set_daily_summary(user_id, hour * 60 + minute)
 
 async def daily(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     if context.args:
         match = re.match(r"^(\d{1,2}):(\d{2})$", context.args[0])
         if not match:
-            await update.message.reply_text("⚠️ Invalid format! Use /daily HH:MM (e.g., /daily 8:30)")
+            await reply(update, "⚠️ Invalid format! Use /daily HH:MM (e.g., /daily 8:30)")
             return
         hour, minute = int(match.group(1)), int(match.group(2))
         if not (0 <= hour < 24 and 0 <= minute < 60):
-            await update.message.reply_text("⚠️ Invalid hour/minute range.")
+            await reply(update, "⚠️ Invalid hour/minute range.")
             return
-        schedule_daily_summary(context.application, user_id, hour, minute)
-        await update.message.reply_text(f"✅ Daily summary set for {hour:02d}:{minute:02d} every day 🌅")
+        await schedule_daily_summary(user_id, hour, minute)
+        await reply(update, f"✅ Daily summary set for {hour:02d}:{minute:02d} every day 🌅")
         return
 
-    schedule_daily_summary(context.application, user_id)
-    await update.message.reply_text("✅ Daily summary enabled at 07:00 AM 🌅")
+    await schedule_daily_summary(user_id)
+    await reply(update, "✅ Daily summary enabled at 07:00 AM 🌅")
 
 # ==============================
 # Offline simple chat replies
 # ==============================
 async def chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = update.message.text.strip().lower()
+    text = update.message.text.strip()
     if text.startswith("/"):
         return
 
-    responses = {
-        "hi": ["Hey there 👋", "Hi! How can I help today?", "Hello friend! 😊"],
-        "how are you": ["I'm just a bot, but feeling great!", "Doing awesome, thanks for asking!"],
-        "who are you": ["I'm LifeBrain, your AI assistant.", "Your digital buddy for tasks and info."],
-        "bye": ["Goodbye! 👋", "See you later!"],
-    }
+    from utils.ai_chat import ai_enabled, ai_reply
 
-    reply = None
-    for key, vals in responses.items():
-        if key in text:
-            reply = random.choice(vals)
-            break
+    if not ai_enabled():
+        # offline intents, answered in the user's chatmode
+        await reply(update, await ai_reply(update.effective_user.id, text))
+        return
 
-    if not reply:
-        reply = random.choice([
-            "Interesting! 🤔",
-            "Tell me more!",
-            "Got it 👍",
-            "I'm here to help — try /help to see what I can do."
-        ])
+    # Stream the AI answer into one message, edited as it grows
+    chat_id = update.effective_chat.id
+    placeholder = await reply(update, "💭 …")
 
-    await update.message.reply_text(reply)
+    async def show(partial):
+        try:
+            await dispatcher.submit(chat_id, placeholder.edit_text, partial)
+        except BadRequest:
+            pass  # e.g. "message is not modified"
+
+    answer = await ai_reply(update.effective_user.id, text, on_update=show)
+    await show(answer or "🤔 I have nothing to add.")
 
 # ==============================
 # CallbackQuery handler
@@ -312,42 +528,143 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     if query.data == "solve_help":
-        await context.bot.send_message(chat_id=query.from_user.id, text="Usage: /solve 24*(5/3)")
+        await dispatcher.send_message(query.from_user.id, "Usage: /solve 24*(5/3)", priority=INTERACTIVE)
     elif query.data == "weather_help":
-        await context.bot.send_message(chat_id=query.from_user.id, text="Usage: /weather <city>")
+        await dispatcher.send_message(query.from_user.id, "Usage: /weather <city>", priority=INTERACTIVE)
     elif query.data == "news_help":
-        await context.bot.send_message(chat_id=query.from_user.id, text="Usage: /news <topic>")
+        await dispatcher.send_message(query.from_user.id, "Usage: /news <topic>", priority=INTERACTIVE)
     elif query.data == "show_tasks":
-        # send the tasks list to the user
-        await context.bot.send_message(chat_id=query.from_user.id, text=format_tasks_text(query.from_user.id), parse_mode="HTML")
+        # send the first page of tasks to the user
+        text, markup = await tasks_page(query.from_user.id)
+        await dispatcher.send_message(query.from_user.id, text, priority=INTERACTIVE, parse_mode="HTML", reply_markup=markup)
+    elif query.data.startswith("tasks:"):
+        # Prev/Next under a task list: turn the page in place
+        try:
+            _, direction, version, cursor, start = query.data.split(":")
+            version, cursor, start = int(version), int(cursor), int(start)
+        except ValueError:
+            return
+        text, markup = await tasks_page(query.from_user.id, cursor, start, direction == "p", version)
+        try:
+            await dispatcher.submit(query.from_user.id, query.edit_message_text, text, parse_mode="HTML", reply_markup=markup)
+        except BadRequest:
+            pass  # e.g. "message is not modified"
     elif query.data == "help":
         # reuse help_command but call it with the callback update
         await help_command(update, context)
     else:
-        await query.edit_message_text("ℹ️ Use /help to see available commands.")
+        await dispatcher.submit(query.from_user.id, query.edit_message_text, "ℹ️ Use /help to see available commands.")
 
 # ==============================
-# Handlers registration
+# /debugstats (admins only, see ADMIN_IDS)
 # ==============================
-app.add_handler(CommandHandler("start", start))
-app.add_handler(CommandHandler("help", help_command))
-app.add_handler(CommandHandler("solve", solve))
-app.add_handler(CommandHandler("translate", translate))
-app.add_handler(CommandHandler("weather", weather))
-app.add_handler(CommandHandler("news", news))
-app.add_handler(CommandHandler("addtask", addtask))
-app.add_handler(CommandHandler("showtasks", showtasks))
-app.add_handler(CommandHandler("daily", daily))
-app.add_handler(CommandHandler("deletetask", deletetask))
-app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, chat))
-app.add_handler(CallbackQueryHandler(button_handler))
+async def debugstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    from utils import datastore, profiler
+    from utils.db import count_daily_summaries, pending_reminders_by_user
+
+    if not profiler.is_admin(update.effective_user.id):
+        await reply(update, "⛔ This command is for admins only.")
+        return
+
+    lines = ["🔧 Debug stats", "", "Scheduled work:"]
+    if owns_scheduler:
+        job_names = sorted(job.name for job in context.application.job_queue.jobs())
+        lines.append(f"  JobQueue jobs: {len(job_names)} ({', '.join(job_names) or 'none'})")
+    else:
+        lines.append("  JobQueue: runs in the scheduler worker")
+    # one row per user; /daily replaces it rather than adding a job
+    lines.append(f"  Daily summary slots: {await count_daily_summaries()}")
+    lines.append(f"  Reminders in memory: {len(reminder_engine)}")
+    for user_id, count in reminder_engine.loaded_by_user().most_common(5):
+        lines.append(f"    user {user_id}: {count}")
+    lines.append("  Pending reminders by user (database):")
+    for user_id, count in await pending_reminders_by_user(5):
+        lines.append(f"    user {user_id}: {count}")
+    send_stats = dispatcher.stats()
+    lines += [
+        "",
+        f"Queues: outbound {dispatcher.queue_depth()}, updates waiting "
+        f"{update_processor.waiting() if update_processor else 0}, DB writes {datastore.pending_writes()}",
+        f"Send latency (last 1000): p50 {send_stats['latency_p50'] * 1000:.0f} ms, "
+        f"p95 {send_stats['latency_p95'] * 1000:.0f} ms",
+        "",
+        *profiler.report_lines(),
+    ]
+    text = "\n".join(lines)
+    await reply(update, text if len(text) <= 4000 else text[:4000] + "\n…")
+
+async def on_error(update, context: ContextTypes.DEFAULT_TYPE):
+    logger.error("Error while handling an update", exc_info=context.error)
+
+# ==============================
+# Application factory & handlers registration
+# ==============================
+def build_app(scheduler=True, reminder_inbox=None, port=METRICS_PORT, send_rate=SEND_GLOBAL_RATE):
+    """
+    Build the Application with every handler registered. In webhook mode each
+    worker process builds one; only the scheduler owner gets a job queue and
+    a reminder engine, the others forward new reminders to `reminder_inbox`.
+    `port` is where this process serves /metrics (0 to disable). `send_rate`
+    is the dispatcher's global rate, this process's share of SEND_GLOBAL_RATE
+    when several processes send as the same bot.
+    """
+    global reminder_engine, owns_scheduler, update_processor, metrics_port
+    from utils.reminders import ReminderEngine, ReminderForwarder
+    from utils.update_processor import PerUserUpdateProcessor
+
+    _require_token()
+    owns_scheduler = scheduler
+    metrics_port = port
+    update_processor = PerUserUpdateProcessor()
+    builder = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(on_startup).post_shutdown(on_shutdown)
+    # different users run concurrently, one user's updates run in order
+    builder = builder.concurrent_updates(update_processor)
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if scheduler:
+        reminder_engine = ReminderEngine(send_reminder, inbox=reminder_inbox)
+    else:
+        reminder_engine = ReminderForwarder(reminder_inbox)
+        builder = builder.job_queue(None)
+    app = builder.build()
+    dispatcher.bot = app.bot
+    dispatcher.set_global_rate(send_rate)
+
+    # every callback is timed per handler (see utils/metrics.py)
+    commands = {
+        "start": start, "help": help_command, "solve": solve, "translate": translate,
+        "weather": weather, "news": news, "convert": convert, "addtask": addtask, "showtasks": showtasks,
+        "daily": daily, "deletetask": deletetask, "debugstats": debugstats,
+    }
+    for name, callback in commands.items():
+        app.add_handler(CommandHandler(name, instrument_handler(name, callback)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler("chat", chat)))
+    app.add_handler(CallbackQueryHandler(instrument_handler("button_handler", button_handler)))
+    app.add_error_handler(on_error)
+    _mark("build_app")
+    return app
+
+_mark("import")
 
 # ==============================
 # Main
 # ==============================
+def run():
+    """Entry point: build the app and serve it by polling or as a webhook."""
+    setup_logging()
+    logger.info("🚀 LifeBrain Bot running (free version)...")
+    # Fix for Windows event loop (safe guard)
+    try:
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    except Exception:
+        pass
+    if BOT_MODE == "webhook":
+        from utils.webhook import run_webhook
+        _require_token()
+        # each worker process builds its own app and opens its own database
+        run_webhook(build_app, TELEGRAM_TOKEN, TELEGRAM_BASE_URL)
+    else:
+        build_app().run_polling()
+
 if __name__ == "__main__":
-    print("🚀 LifeBrain Bot running (free version)...")
-    init_db()
-    init_memory()
-    app.run_polling()
-            
\ No newline at end of file
+    run()
@@ -1,63 +1,145 @@
 # utils/ai_chat.py
+import asyncio
+import json
 import os
-import random
+import time
+from collections import OrderedDict, deque
+from utils.http_client import get_client
+from utils.intents import get_engine
+from utils.memory import get_user_pref
+from utils.metrics import upstream
 
-OPENAI_KEY = os.getenv("OPENAI_KEY", "")
+OPENAI_KEY = os.getenv("OPENAI_KEY", "").strip()
+# Any OpenAI-compatible endpoint, e.g. a local stub server for tests
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "30"))
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "8"))
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "20"))
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "1500"))
+CHAT_MAX_USERS = int(os.getenv("CHAT_MAX_USERS", "10000"))
+# Minimum seconds between progressive edits of a streaming reply
+CHAT_EDIT_INTERVAL = float(os.getenv("CHAT_EDIT_INTERVAL", "1.0"))
+
+SYSTEM_PROMPTS = {
+    "study": "You are a helpful study assistant. Be clear and concise.",
+    "coach": "You are a motivational coach. Be short and positive.",
+    "friend": "You are a friendly chat companion.",
+}
+
+_semaphore = asyncio.Semaphore(CHAT_CONCURRENCY)
+_histories = OrderedDict()  # user_id -> deque of recent messages, least recently used first
+_inflight = {}              # request key (see ai_reply) -> (asyncio.Task, edit callbacks)
+
+def ai_enabled():
+    return bool(OPENAI_KEY)
 
 def ai_reply_local(text: str, mode: str = "default"):
     """Local fallback mini-chat without OpenAI API."""
-    text = text.lower()
-
-    if mode == "study":
-        return random.choice([
-            "Let's break that down step-by-step.",
-            "Focus on the core concept first.",
-            "Try solving smaller examples before the big one."
-        ])
-    if mode == "coach":
-        return random.choice([
-            "You got this! One step at a time.",
-            "Keep going — consistency is key.",
-            "Believe in yourself, progress takes time!"
-        ])
-    if mode == "friend":
-        return random.choice([
-            "Haha, tell me more! 😄",
-            "That's cool — what's next?",
-            "I'm here for you anytime."
-        ])
-
-    return random.choice([
-        "Interesting — tell me more!",
-        "How can I assist further?",
-        "I can summarize or help explain if you'd like."
-    ])
-
-def ai_reply(text: str, mode: str = "default"):
-    """Main AI reply: uses OpenAI if available, else local fallback."""
-    if OPENAI_KEY:
-        try:
-            import openai
-            openai.api_key = OPENAI_KEY
-
-            system_prompt = {
-                "study": "You are a helpful study assistant. Be clear and concise.",
-                "coach": "You are a motivational coach. Be short and positive.",
-                "friend": "You are a friendly chat companion.",
-            }.get(mode, "You are a helpful assistant.")
-
-            resp = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": text}
-                ],
-                max_tokens=200,
-                temperature=0.7,
-            )
-            return resp.choices[0].message.content.strip()
-
-        except Exception as e:
-            return f"(AI error: {e})"
+    _, reply = get_engine().respond(text, mode)
+    return reply
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 4
+
+def _history(user_id):
+    history = _histories.get(user_id)
+    if history is None:
+        history = _histories[user_id] = deque(maxlen=CHAT_HISTORY_TURNS * 2)
+        if len(_histories) > CHAT_MAX_USERS:
+            _histories.popitem(last=False)
     else:
+        _histories.move_to_end(user_id)
+    return history
+
+def _build_messages(history, text, mode):
+    """System prompt + as many recent turns as fit the token budget + the new prompt."""
+    system = SYSTEM_PROMPTS.get(mode, "You are a helpful assistant.")
+    budget = CHAT_TOKEN_BUDGET - estimate_tokens(system) - estimate_tokens(text)
+    recent = []
+    for message in reversed(history):
+        budget -= estimate_tokens(message["content"])
+        if budget < 0:
+            break
+        recent.append(message)
+    recent.reverse()
+    return [{"role": "system", "content": system}, *recent, {"role": "user", "content": text}]
+
+async def _stream_completion(messages):
+    """Yield content deltas from a streaming chat completion (server-sent events)."""
+    url = f"{OPENAI_BASE_URL}/chat/completions"
+    payload = {
+        "model": OPENAI_MODEL,
+        "messages": messages,
+        "max_tokens": 200,
+        "temperature": 0.7,
+        "stream": True,
+    }
+    headers = {"Authorization": f"Bearer {OPENAI_KEY}"}
+    async with get_client(url).stream("POST", url, json=payload, headers=headers, timeout=CHAT_TIMEOUT) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+@upstream("openai")
+async def _complete(messages, listeners):
+    """One streamed completion; every callback in `listeners` gets the progressive edits."""
+    parts = []
+    last_update = time.monotonic()
+    async with _semaphore:
+        async for delta in _stream_completion(messages):
+            parts.append(delta)
+            if listeners and time.monotonic() - last_update >= CHAT_EDIT_INTERVAL:
+                last_update = time.monotonic()
+                partial = "".join(parts) + " ▌"
+                await asyncio.gather(*(on_update(partial) for on_update in list(listeners)), return_exceptions=True)
+    return "".join(parts).strip()
+
+def _finished(key, task):
+    _inflight.pop(key, None)
+    # mark the error as seen even if every waiter went away
+    if not task.cancelled():
+        task.exception()
+
+async def ai_reply(user_id, text: str, mode=None, on_update=None):
+    """
+    Main AI reply: streams from the chat completion API if a key is set, else
+    uses the local fallback. `on_update(partial_text)` is awaited as the reply
+    grows. Requests that are identical while one is in flight (same mode,
+    context and prompt, e.g. a common first message from several new users)
+    share one completion; each user's history still gets its own turn.
+    """
+    if mode is None:
+        mode = await get_user_pref(user_id, "chatmode") or "default"
+    if not OPENAI_KEY:
         return ai_reply_local(text, mode)
+
+    history = _history(user_id)
+    messages = _build_messages(history, text, mode)
+    key = json.dumps([*messages[:-1], " ".join(text.split())])
+    entry = _inflight.get(key)
+    if entry is None:
+        listeners = []
+        entry = _inflight[key] = (asyncio.ensure_future(_complete(messages, listeners)), listeners)
+        entry[0].add_done_callback(lambda t: _finished(key, t))
+    task, listeners = entry
+    if on_update is not None:
+        listeners.append(on_update)
+    try:
+        reply = await asyncio.shield(task)
+    except Exception as e:
+        return f"(AI error: {e})"
+    finally:
+        if on_update is not None:
+            listeners.remove(on_update)
+    history.append({"role": "user", "content": text})
+    history.append({"role": "assistant", "content": reply})
+    return reply
@@ -0,0 +1,141 @@
+# utils/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+
+from utils.metrics import Counter, Gauge
+
+# Every cache registers itself here by name so stats can be reported in one place
+CACHES = {}
+
+
+class TTLCache:
+    """
+    Async LRU cache with a per-entry TTL.
+    - concurrent misses for one key share a single in-flight fetch
+    - entries older than `ttl` but younger than `ttl + stale_ttl` are served
+      immediately while a background refresh runs
+    - failed fetches are never cached
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=600.0, stale_ttl=0.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}         # key -> asyncio.Task
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        CACHES[name] = self
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, allow_stale=False):
+        """Return a cached value without fetching, or None."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age < self.ttl or (allow_stale and age < self.ttl + self.stale_ttl):
+            return value
+        return None
+
+    def last_known(self, key):
+        """Return the cached value however old it is, or None (for degraded answers)."""
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    async def refresh(self, key, fetch):
+        """Fetch `key` now and store it, even if a fresh entry exists."""
+        return await asyncio.shield(self._load(key, fetch))
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for `key`, calling `fetch()` (a coroutine function) on a miss."""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                self._load(key, fetch)
+                return value
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # shield: one cancelled waiter must not cancel the fetch other waiters share
+        return await asyncio.shield(self._load(key, fetch))
+
+    def _load(self, key, fetch):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        return task
+
+    async def _fetch_and_store(self, key, fetch):
+        try:
+            value = await fetch()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _consume_exception(task):
+    # background refreshes have no awaiter; mark their errors as retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+def cache_stats():
+    """Return stats for every registered cache, keyed by name."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def _lookup_counts():
+    counts = {}
+    for name, cache in CACHES.items():
+        for result in ("hits", "stale_hits", "misses", "coalesced"):
+            counts[(name, result)] = getattr(cache, result)
+    return counts
+
+
+Gauge("lifebrain_cache_entries", "Entries held per cache", ["cache"],
+      collect=lambda: {(name,): len(cache) for name, cache in CACHES.items()})
+Counter("lifebrain_cache_lookups_total", "Cache lookups by result", ["cache", "result"], collect=_lookup_counts)
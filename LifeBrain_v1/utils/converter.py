@@ -1,20 +1,125 @@
 # utils/converter.py
-import requests
+import asyncio
+import json
+import os
+import re
+import time
+from utils import datastore
+from utils.http_client import get_json
+from utils.logger import logger
+from utils.metrics import Gauge, upstream
 
-def convert_currency(amount, from_curr, to_curr):
+EXCHANGE_RATES_URL = os.getenv("EXCHANGE_RATES_URL", "https://api.exchangerate.host/latest")
+RATES_BASE = os.getenv("RATES_BASE", "USD").upper()
+RATES_REFRESH = float(os.getenv("RATES_REFRESH", "3600"))
+RATES_RETRY = float(os.getenv("RATES_RETRY", "60"))  # wait after a failed refresh
+
+CURRENCY_RE = re.compile(r"^[A-Za-z]{3}$")
+
+# The whole table for RATES_BASE (currency -> units per 1 RATES_BASE) lives in
+# memory; every conversion is two lookups and a division. The last good table
+# is also kept in the `rate_snapshots` table for restarts and upstream outages.
+_table = {"rates": {}, "fetched_at": 0.0}
+_refresh_task = None
+_next_attempt = 0.0
+_restored = False
+
+@upstream("exchangerate")
+async def _fetch_rates(base):
+    r = await get_json(EXCHANGE_RATES_URL, params={"base": base}, upstream="exchangerate")
+    rates = r.get("rates")
+    if not rates:
+        raise RuntimeError("No exchange rates returned.")
+    rates = {code.upper(): float(rate) for code, rate in rates.items() if rate}
+    rates[base] = 1.0
+    return rates
+
+def _read_snapshot(conn, base):
+    return conn.execute("SELECT rates, fetched_at FROM rate_snapshots WHERE base=?", (base,)).fetchone()
+
+async def _restore():
+    """Load the last snapshot from SQLite once per process."""
+    global _restored
+    _restored = True
+    row = await datastore.run_read(_read_snapshot, RATES_BASE)
+    if row and row[1] > _table["fetched_at"]:
+        _table["rates"], _table["fetched_at"] = json.loads(row[0]), float(row[1])
+
+async def refresh_rates():
+    """Fetch the table from upstream, swap it in and persist the snapshot."""
+    global _next_attempt
+    try:
+        rates = await _fetch_rates(RATES_BASE)
+    except Exception:
+        _next_attempt = time.time() + RATES_RETRY
+        raise
+    fetched_at = time.time()
+    _table["rates"], _table["fetched_at"] = rates, fetched_at
+    await datastore.execute(
+        "INSERT OR REPLACE INTO rate_snapshots (base, rates, fetched_at) VALUES (?, ?, ?)",
+        (RATES_BASE, json.dumps(rates), int(fetched_at)),
+    )
+    return rates
+
+def _start_refresh():
+    """One refresh at a time; concurrent callers share it."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(refresh_rates())
+        _refresh_task.add_done_callback(_log_failure)
+    return _refresh_task
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Exchange rate refresh failed: %s", task.exception())
+
+async def get_rates():
+    """
+    Return the rate table. A stale table is returned at once while a
+    background refresh runs; only a process with no table at all waits.
+    """
+    if not _restored:
+        await _restore()
+    now = time.time()
+    if now - _table["fetched_at"] >= RATES_REFRESH and now >= _next_attempt:
+        task = _start_refresh()
+        if not _table["rates"]:
+            await asyncio.shield(task)
+    if not _table["rates"]:
+        raise RuntimeError("Exchange rates are unavailable right now, try again shortly.")
+    return _table["rates"]
+
+def cross_rate(rates, from_curr, to_curr):
+    """Units of `to_curr` per 1 `from_curr`, via the base currency."""
+    return rates[to_curr] / rates[from_curr]
+
+async def convert_currency(amount, from_curr, to_curr):
     """
-    Uses exchangerate.host free API.
+    Convert with the cached exchangerate.host table; upstream is only hit
+    once per RATES_REFRESH.
     """
     try:
         amount = float(amount)
     except:
         return "❌ Amount must be a number."
+    if not (CURRENCY_RE.match(from_curr) and CURRENCY_RE.match(to_curr)):
+        return "❌ Use 3-letter currency codes, e.g. USD EUR."
+    from_curr, to_curr = from_curr.upper(), to_curr.upper()
 
-    url = f"https://api.exchangerate.host/convert?from={from_curr}&to={to_curr}&amount={amount}"
     try:
-        r = requests.get(url, timeout=10).json()
-        if r.get("result") is not None:
-            return f"💱 {amount} {from_curr} = {round(r['result'], 2)} {to_curr}"
-        return "⚠️ Conversion failed."
+        rates = await get_rates()
     except Exception as e:
         return f"⚠️ Error: {e}"
+    missing = [code for code in (from_curr, to_curr) if code not in rates]
+    if missing:
+        return f"❌ Unknown currency: {', '.join(missing)}"
+
+    rate = cross_rate(rates, from_curr, to_curr)
+    text = f"💱 {amount:,.10g} {from_curr} = {round(amount * rate, 2):,} {to_curr}\n📈 1 {from_curr} = {rate:.6g} {to_curr}"
+    age = time.time() - _table["fetched_at"]
+    if age >= RATES_REFRESH:
+        text += f"\nℹ️ Rates from {time.strftime('%Y-%m-%d %H:%M', time.localtime(_table['fetched_at']))} (update pending)"
+    return text
+
+Gauge("lifebrain_exchange_rates_age_seconds", "Age of the exchange rate table in memory",
+      collect=lambda: time.time() - _table["fetched_at"] if _table["rates"] else 0)
@@ -1,37 +1,86 @@
 # utils/daily_summary.py
+import asyncio
+import os
 from datetime import datetime
-from utils.weather import get_weather
-from utils.news import get_news
-from utils.db import get_tasks
-from utils.memory import get_user_pref  # ✅ Added import
+from utils.weather import get_weather, normalize_city
+from utils.news import get_news, DAILY_NEWS_TOPIC
+from utils.db import get_tasks_bulk
+from utils.memory import prefetch_prefs
 
-def get_daily_summary(user_id, default_city="your city"):
-    """Generate a full daily summary: tasks, weather, and news."""
-    
+# Users rendered per batch: one tasks query + at most one prefs query per chunk
+SUMMARY_CHUNK = int(os.getenv("SUMMARY_CHUNK", "500"))
+# Concurrent weather lookups while building one chunk
+SUMMARY_UPSTREAM_CONCURRENCY = int(os.getenv("SUMMARY_UPSTREAM_CONCURRENCY", "10"))
+
+def render_summary(saved_city, weather_info, news_info, tasks, today):
+    """Format one summary: tasks, weather, and news."""
     # 🗓️ Tasks
-    tasks = get_tasks(user_id)
     if tasks:
         task_text = "\n".join([f"• {t[0]} — {t[1]}" for t in tasks])
     else:
         task_text = "No tasks for today ✅"
 
-    # 🏙️ City preference
-    saved_city = get_user_pref(user_id, "city") or default_city
-
-    # 🌤️ Weather
-    weather_info = get_weather(saved_city)
-
-    # 📰 News
-    news_info = get_news("technology")
-
     # 📅 Format summary
-    now = datetime.now().strftime("%A, %d %B %Y")
-    summary = (
+    return (
         f"🌅 *Good Morning!*\n\n"
-        f"📅 {now}\n\n"
+        f"📅 {today}\n\n"
         f"🌤️ Weather in {saved_city}:\n{weather_info}\n\n"
         f"📰 News:\n{news_info}\n\n"
         f"🗓️ Tasks:\n{task_text}\n\n"
         f"💡 Have a productive day!"
     )
-    return summary
+
+async def build_summaries(user_ids, default_city="your city"):
+    """
+    Build summaries for many users at once: {user_id: text}.
+    Tasks come from one bulk query and cities from the preference cache
+    (uncached users are prefetched in bulk); weather is fetched once per
+    distinct city and news once for the whole batch.
+    """
+    tasks_by_user = await get_tasks_bulk(user_ids)
+    prefs = await prefetch_prefs(user_ids)
+    saved_cities = {user_id: prefs[user_id].get("city") or default_city for user_id in user_ids}
+
+    limit = asyncio.Semaphore(SUMMARY_UPSTREAM_CONCURRENCY)
+
+    async def weather_for(city):
+        async with limit:
+            return await get_weather(city)
+
+    distinct = {}
+    for city in saved_cities.values():
+        distinct.setdefault(normalize_city(city), city)
+    weather_results, news_info = await asyncio.gather(
+        asyncio.gather(*(weather_for(city) for city in distinct.values())),
+        get_news(DAILY_NEWS_TOPIC),
+    )
+    weather_by_city = dict(zip(distinct, weather_results))
+
+    today = datetime.now().strftime("%A, %d %B %Y")
+    return {
+        user_id: render_summary(
+            city, weather_by_city[normalize_city(city)], news_info, tasks_by_user.get(user_id, []), today
+        )
+        for user_id, city in saved_cities.items()
+    }
+
+async def get_daily_summary(user_id, default_city="your city"):
+    """Generate a full daily summary: tasks, weather, and news."""
+    summaries = await build_summaries([user_id], default_city)
+    return summaries[user_id]
+
+async def run_daily_summaries(user_ids, send):
+    """
+    Fan out summaries to `user_ids` chunk by chunk, handing each one to
+    `send(user_id, text)` (expected to bound its own concurrency).
+    Returns the number of summaries sent.
+    """
+    sent = 0
+    for start in range(0, len(user_ids), SUMMARY_CHUNK):
+        chunk = user_ids[start:start + SUMMARY_CHUNK]
+        summaries = await build_summaries(chunk)
+        await asyncio.gather(
+            *(send(user_id, text) for user_id, text in summaries.items()), return_exceptions=True
+        )
+        sent += len(summaries)
+    return sent
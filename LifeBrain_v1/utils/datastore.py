@@ -0,0 +1,200 @@
+# utils/datastore.py
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import groupby
+
+DB_PATH = os.getenv("LIFEBRAIN_DB", "lifebrain.db")
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(64 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = 256
+# FULL fsyncs every commit, so a committed write survives power loss; group
+# commit spreads that cost over a batch. NORMAL is faster but not durable in WAL.
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "FULL").upper()
+# Group commit: at most this many queued writes per transaction
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "512"))
+
+_conn = None
+_lock = threading.RLock()
+# One worker thread runs every query, so access stays serialized on the single
+# shared connection while the event loop never waits on SQLite.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="datastore")
+
+
+def connect(path=None) -> sqlite3.Connection:
+    """Open a connection with WAL and the tuned pragmas."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        check_same_thread=False,
+        cached_statements=SQLITE_STATEMENT_CACHE,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return the long-lived shared connection, opening it on first use."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = connect()
+        return _conn
+
+
+def read(fn, *args):
+    """Call fn(conn, *args) on the shared connection (blocking)."""
+    with _lock:
+        return fn(get_connection(), *args)
+
+
+def write(fn, *args):
+    """Call fn(conn, *args) inside a transaction on the shared connection (blocking)."""
+    with _lock:
+        conn = get_connection()
+        with conn:
+            return fn(conn, *args)
+
+
+async def run_read(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, read, fn, *args)
+
+
+async def run_write(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, write, fn, *args)
+
+
+async def fetchall(sql, params=()):
+    return await run_read(lambda conn: conn.execute(sql, params).fetchall())
+
+
+async def fetchone(sql, params=()):
+    return await run_read(lambda conn: conn.execute(sql, params).fetchone())
+
+
+async def execute(sql, params=()):
+    """Run one write statement in its own transaction; returns the cursor's rowcount."""
+    return await run_write(lambda conn: conn.execute(sql, params).rowcount)
+
+
+# --- group commit (write-behind queue) ---
+
+_batch = []           # (sql, params, result, future) in submission order
+_flusher = None       # task committing queued writes, None when idle
+_last_write = {}      # key -> future of the key's most recent queued write
+
+
+def queue_write(sql, params=(), key=None, result=None):
+    """
+    Queue one write for the next group commit and return a future that
+    resolves once its transaction has committed (durably with the default
+    synchronous=FULL). A write commits as soon as no other commit is in
+    flight; writes queued meanwhile form the next batch. Consecutive writes of the
+    same statement go through one executemany; `result` ("lastrowid",
+    "rowcount" or "rows" for RETURNING) runs that write on its own, inside
+    the same transaction, and resolves the future with the value. `key`
+    (usually a user id) lets readers wait for that key's writes, see
+    wait_for_writes().
+    """
+    global _flusher
+    future = asyncio.get_running_loop().create_future()
+    _batch.append((sql, params, result, future))
+    if key is not None:
+        _last_write[key] = future
+        future.add_done_callback(partial(_forget, key))
+    if _flusher is None:
+        _flusher = asyncio.ensure_future(_flush())
+    return future
+
+
+def _forget(key, future):
+    if _last_write.get(key) is future:
+        del _last_write[key]
+
+
+async def wait_for_writes(key):
+    """Wait until every write queued under `key` has committed (read-your-writes)."""
+    future = _last_write.get(key)
+    if future is not None:
+        # batches commit in order, so the latest write covers the earlier ones
+        await asyncio.wait([future])
+
+
+def pending_writes():
+    """Writes queued for the next group commit."""
+    return len(_batch)
+
+
+async def flush_writes():
+    """Commit everything queued so far."""
+    while _flusher is not None:
+        await asyncio.shield(_flusher)
+
+
+async def _flush():
+    global _batch, _flusher
+    try:
+        # no idle wait: writes queued in the same loop tick share the first
+        # commit, and whatever arrives while it runs forms the next batch
+        while _batch:
+            batch, _batch = _batch[:WRITE_BATCH_SIZE], _batch[WRITE_BATCH_SIZE:]
+            await _commit(batch)
+    finally:
+        _flusher = None
+
+
+async def _commit(batch):
+    try:
+        results = await run_write(_apply, batch)
+    except Exception:
+        # one bad write must not fail its neighbours: retry each in its own transaction
+        for item in batch:
+            try:
+                (value,) = await run_write(_apply, [item])
+            except Exception as e:
+                _settle(item[3], error=e)
+            else:
+                _settle(item[3], value)
+        return
+    for item, value in zip(batch, results):
+        _settle(item[3], value)
+
+
+def _settle(future, value=None, error=None):
+    if future.done():  # the caller gave up waiting; the write still happened
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+
+
+def _apply(conn, batch):
+    results = []
+    for (sql, many), items in groupby(batch, key=lambda item: (item[0], item[2] is None)):
+        items = list(items)
+        if many:
+            conn.executemany(sql, [item[1] for item in items])
+            results.extend([None] * len(items))
+            continue
+        for _, params, result, _ in items:
+            cursor = conn.execute(sql, params)
+            results.append(cursor.fetchall() if result == "rows" else getattr(cursor, result))
+    return results
+
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
@@ -1,52 +1,186 @@
 # utils/db.py
-import sqlite3
-DB_PATH = "lifebrain.db"
+import asyncio
+import itertools
+import os
+import time
+from utils import datastore
+from utils.cache import TTLCache
+from utils.migrations import migrate
+
+TASK_PAGE_CACHE_USERS = int(os.getenv("TASK_PAGE_CACHE_USERS", "10000"))
+TASK_PAGES_PER_USER = int(os.getenv("TASK_PAGES_PER_USER", "20"))
+INSERT_CHUNK = 200  # rows per multi-row INSERT, well inside SQLite's bound-parameter limit
+
+# Per user: (version of the task list, {page key: rendered /showtasks page}),
+# at most TASK_PAGES_PER_USER pages each (see main.py). Adding or deleting
+# tasks replaces the entry with a new version and no pages, so a page is never
+# stale. Paging buttons carry the version so a button under an outdated list
+# starts over from page 1.
+task_pages = TTLCache("task_pages", maxsize=TASK_PAGE_CACHE_USERS, ttl=float("inf"))
+
+# Versions come from one counter, so a user whose entry was evicted gets one
+# no button was ever sent with. Counting from the start time does the same
+# for buttons sent before a restart.
+_next_version = itertools.count(int(time.time())).__next__
+
+async def _new_task_entry():
+    return _next_version(), {}
+
+def task_version(user_id):
+    entry = task_pages.get(user_id)
+    if entry is None:
+        entry = _next_version(), {}
+        task_pages.set(user_id, entry)
+    return entry[0]
+
+async def cached_task_pages(user_id):
+    """The user's cached pages for the current version: {page key: page}."""
+    return (await task_pages.get_or_fetch(user_id, _new_task_entry))[1]
+
+def _tasks_changed(user_id):
+    task_pages.set(user_id, (_next_version(), {}))
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS tasks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        task TEXT,
-        time TEXT
-    );
-    """)
-    conn.commit()
-    conn.close()
-
-def add_task(user_id, task, time):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO tasks (user_id, task, time) VALUES (?, ?, ?)", (user_id, task, time))
-    conn.commit()
-    conn.close()
-
-def get_tasks(user_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT task, time FROM tasks WHERE user_id=?", (user_id,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-def delete_task(user_id: int, task_index: int):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT id FROM tasks WHERE user_id=? ORDER BY id",
-        (user_id,)
-    )
-    rows = cursor.fetchall()
-
-    if task_index < 1 or task_index > len(rows):
-        conn.close()
+    migrate()
+
+async def add_task(user_id, task, time, due_at=None):
+    """Insert a task and return its id. `due_at` is the absolute due time in unix seconds."""
+    task_id = await datastore.queue_write(
+        "INSERT INTO tasks (user_id, task, time, due_at) VALUES (?, ?, ?, ?)",
+        (user_id, task, time, due_at), key=user_id, result="lastrowid",
+    )
+    _tasks_changed(user_id)
+    return task_id
+
+async def add_tasks(user_id, tasks):
+    """
+    Insert many (task, time, due_at) entries with one multi-row INSERT and
+    return their ids in the same order.
+    """
+    writes = []
+    for start in range(0, len(tasks), INSERT_CHUNK):
+        chunk = tasks[start:start + INSERT_CHUNK]
+        values = ", ".join(["(?, ?, ?, ?)"] * len(chunk))
+        params = tuple(value for entry in chunk for value in (user_id, *entry))
+        # queued together, so every chunk commits in the same transaction
+        writes.append(datastore.queue_write(
+            f"INSERT INTO tasks (user_id, task, time, due_at) VALUES {values} RETURNING id",
+            params, key=user_id, result="rows",
+        ))
+    results = await asyncio.gather(*writes)
+    _tasks_changed(user_id)
+    # RETURNING order is unspecified; ids grow in VALUES order
+    return sorted(row[0] for rows in results for row in rows)
+
+async def get_tasks(user_id):
+    # ORDER BY id keeps the numbering in /showtasks in line with /deletetask
+    await datastore.wait_for_writes(user_id)
+    return await datastore.fetchall("SELECT task, time FROM tasks WHERE user_id=? ORDER BY id", (user_id,))
+
+async def get_tasks_page(user_id, cursor=0, limit=10, before=False):
+    """
+    One page of tasks, seeking on (user_id, id) so deep pages cost the same as
+    the first: the `limit` tasks after id `cursor`, or before it if `before`.
+    Returns ([(id, task, time), ...] in id order, whether more lie beyond).
+    """
+    await datastore.wait_for_writes(user_id)
+    if before:
+        rows = await datastore.fetchall(
+            "SELECT id, task, time FROM tasks WHERE user_id=? AND id<? ORDER BY id DESC LIMIT ?",
+            (user_id, cursor, limit + 1),
+        )
+        return rows[:limit][::-1], len(rows) > limit
+    rows = await datastore.fetchall(
+        "SELECT id, task, time FROM tasks WHERE user_id=? AND id>? ORDER BY id LIMIT ?",
+        (user_id, cursor, limit + 1),
+    )
+    return rows[:limit], len(rows) > limit
+
+async def get_tasks_bulk(user_ids):
+    """Tasks for many users in one query: {user_id: [(task, time), ...]} in id order."""
+    placeholders = ",".join("?" * len(user_ids))
+    rows = await datastore.fetchall(
+        f"SELECT user_id, task, time FROM tasks WHERE user_id IN ({placeholders}) ORDER BY user_id, id",
+        tuple(user_ids),
+    )
+    tasks = {}
+    for user_id, task, time_str in rows:
+        tasks.setdefault(user_id, []).append((task, time_str))
+    return tasks
+
+async def delete_task(user_id: int, task_index: int):
+    """Delete the user's n-th task (1-based, in id order). Returns False if there is none."""
+    if task_index < 1:
         return False
+    # queued behind the user's pending inserts, so the numbering is the one they saw
+    deleted = await datastore.queue_write(
+        "DELETE FROM tasks WHERE id = (SELECT id FROM tasks WHERE user_id=? ORDER BY id LIMIT 1 OFFSET ?)",
+        (user_id, task_index - 1), key=user_id, result="rowcount",
+    )
+    if deleted:
+        _tasks_changed(user_id)
+    return deleted == 1
+
+# --- reminder queries (see utils/reminders.py) ---
+
+async def fetch_pending_reminders(before, limit):
+    """Pending reminders due before `before`, earliest first: (due_at, id, user_id, task)."""
+    return await datastore.fetchall(
+        "SELECT due_at, id, user_id, task FROM tasks WHERE reminded = 0 AND due_at < ? ORDER BY due_at LIMIT ?",
+        (before, limit),
+    )
+
+async def claim_reminders(task_ids):
+    """Mark reminders as sent and return the ids that were still pending (deleted tasks drop out)."""
+    def claim(conn):
+        placeholders = ",".join("?" * len(task_ids))
+        rows = conn.execute(
+            f"UPDATE tasks SET reminded = 1 WHERE reminded = 0 AND id IN ({placeholders}) RETURNING id",
+            tuple(task_ids),
+        ).fetchall()
+        return {row[0] for row in rows}
+    return await datastore.run_write(claim)
+
+async def release_reminders(task_ids):
+    """Mark claimed reminders as pending again, e.g. ones a stopping engine never sent."""
+    placeholders = ",".join("?" * len(task_ids))
+    return await datastore.execute(
+        f"UPDATE tasks SET reminded = 0 WHERE id IN ({placeholders})", tuple(task_ids)
+    )
+
+async def skip_missed_reminders(before):
+    """Mark reminders due before `before` as handled without sending them."""
+    return await datastore.execute(
+        "UPDATE tasks SET reminded = 1 WHERE reminded = 0 AND due_at < ?", (before,)
+    )
+
+async def pending_reminders_by_user(limit=10):
+    """The users with the most pending reminders: [(user_id, count), ...]."""
+    return await datastore.fetchall(
+        "SELECT user_id, COUNT(*) FROM tasks WHERE reminded = 0 AND due_at IS NOT NULL "
+        "GROUP BY user_id ORDER BY 2 DESC LIMIT ?",
+        (limit,),
+    )
+
+# --- daily summary slots (see utils/daily_summary.py) ---
+
+async def set_daily_summary(user_id, minute_of_day):
+    await datastore.execute(
+        "INSERT INTO daily_summaries (user_id, minute_of_day) VALUES (?, ?) "
+        "ON CONFLICT(user_id) DO UPDATE SET minute_of_day = excluded.minute_of_day",
+        (user_id, minute_of_day),
+    )
+
+async def get_daily_summary_users(minute_of_day):
+    rows = await datastore.fetchall(
+        "SELECT user_id FROM daily_summaries WHERE minute_of_day = ? ORDER BY user_id", (minute_of_day,)
+    )
+    return [row[0] for row in rows]
+
+async def has_daily_summaries(minute_of_day):
+    row = await datastore.fetchone("SELECT 1 FROM daily_summaries WHERE minute_of_day = ? LIMIT 1", (minute_of_day,))
+    return row is not None
 
-    task_id = rows[task_index - 1][0]
-    cursor.execute("DELETE FROM tasks WHERE id=?", (task_id,))
-    conn.commit()
-    conn.close()
-    return True
+async def count_daily_summaries():
+    row = await datastore.fetchone("SELECT COUNT(*) FROM daily_summaries")
+    return row[0]
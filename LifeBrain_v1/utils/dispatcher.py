@@ -0,0 +1,233 @@
+# utils/dispatcher.py
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from utils.metrics import SEND_SECONDS
+
+# Priority lanes: lower goes first
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", "64"))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations: reserve() returns how long to wait."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        # a negative balance is a queue of reservations already handed out
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def take(self):
+        """Take a token if one is available now, without reserving one otherwise."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def idle(self):
+        """True once the bucket has refilled completely."""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+class Dispatcher:
+    """
+    Single outbound queue for everything the bot sends.
+
+    Calls are queued by priority lane and delivered by a pool of workers that
+    respect a global and a per-chat token bucket. The worker that picked up a
+    chat drains it, so other workers are never blocked on a slow chat; within
+    a chat, interactive replies go ahead of bulk sends and each lane keeps
+    its order. Global tokens go to waiting workers by (priority, seq) too, so
+    a reply is not stuck behind bulk sends other workers already picked up.
+    RetryAfter and network errors are retried with backoff; anything else is
+    raised to the caller.
+    """
+
+    def __init__(self, bot=None, global_rate=SEND_GLOBAL_RATE, chat_rate=SEND_CHAT_RATE,
+                 chat_burst=SEND_CHAT_BURST, workers=SEND_WORKERS, max_retries=SEND_MAX_RETRIES):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets = {}   # chat_id -> TokenBucket
+        self._serving = {}   # chat_id -> heap of (priority, seq, job) waiting behind the one in flight
+        self._gate = []      # heap of (priority, seq, future) of workers waiting for a global token
+        self._gate_task = None
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._tasks = []
+        # metrics
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.flood_waits = 0
+        self._latencies = deque(maxlen=1000)
+
+    def set_global_rate(self, rate):
+        """Change the global send rate, e.g. to this process's share of the bot's limit."""
+        self._global = TokenBucket(rate, rate)
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        if self._gate_task is not None:
+            self._gate_task.cancel()
+            self._gate_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, chat_id, call, /, *args, priority=INTERACTIVE, **kwargs):
+        """Queue `call(*args, **kwargs)` (a Bot API coroutine function) for `chat_id` and await its result."""
+        future = asyncio.get_running_loop().create_future()
+        job = (chat_id, call, args, kwargs, future, time.monotonic())
+        self._queue.put_nowait((priority, next(self._seq), job))
+        return await future
+
+    async def send_message(self, chat_id, text, priority=BULK, **kwargs):
+        return await self.submit(chat_id, self.bot.send_message, chat_id=chat_id, text=text, priority=priority, **kwargs)
+
+    async def _worker(self):
+        while True:
+            entry = await self._queue.get()
+            chat_id = entry[2][0]
+            waiting = self._serving.get(chat_id)
+            if waiting is not None:
+                # another worker owns this chat and delivers by (priority, seq)
+                heapq.heappush(waiting, entry)
+                continue
+            waiting = self._serving[chat_id] = []
+            try:
+                await self._deliver(entry[0], entry[2])
+                while waiting:
+                    priority, _, job = heapq.heappop(waiting)
+                    await self._deliver(priority, job)
+            finally:
+                del self._serving[chat_id]
+
+    async def _deliver(self, priority, job):
+        chat_id, call, args, kwargs, future, enqueued = job
+        if future.done():  # caller gave up
+            return
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._chat_bucket(chat_id).reserve())
+            await self._global_token(priority)
+            try:
+                result = await call(*args, **kwargs)
+            except RetryAfter as e:
+                self.flood_waits += 1
+                error, delay = e, float(e.retry_after)
+            except BadRequest as e:
+                # BadRequest subclasses NetworkError but retrying cannot fix it
+                self._finish(priority, future, enqueued, error=e)
+                return
+            except NetworkError as e:
+                error, delay = e, min(0.5 * 2 ** attempt, 10)
+            except Exception as e:
+                self._finish(priority, future, enqueued, error=e)
+                return
+            else:
+                self._finish(priority, future, enqueued, result=result)
+                return
+            if attempt >= self.max_retries:
+                self._finish(priority, future, enqueued, error=error)
+                return
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _global_token(self, priority):
+        """Wait for a global token; waiters are served by (priority, seq), not arrival."""
+        if not self._gate and self._global.take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._gate, (priority, next(self._seq), future))
+        if self._gate_task is None:
+            self._gate_task = asyncio.create_task(self._release_tokens())
+        await future
+
+    async def _release_tokens(self):
+        # hand each token, as it becomes available, to the best waiter at that moment
+        try:
+            while self._gate:
+                await asyncio.sleep(self._global.reserve())
+                while self._gate:
+                    future = heapq.heappop(self._gate)[2]
+                    if not future.done():  # skip workers that were cancelled
+                        future.set_result(None)
+                        break
+        finally:
+            self._gate_task = None
+
+    def _finish(self, priority, future, enqueued, result=None, error=None):
+        latency = time.monotonic() - enqueued
+        self._latencies.append(latency)
+        SEND_SECONDS.labels(PRIORITY_NAMES.get(priority, str(priority))).observe(latency)
+        if error is None:
+            self.sent += 1
+            if not future.done():
+                future.set_result(result)
+        else:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(error)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) >= 10000:
+                # forget chats whose bucket has refilled; they behave like new ones
+                self._buckets = {c: b for c, b in self._buckets.items() if not b.idle()}
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def queue_depth(self):
+        return self._queue.qsize() + sum(len(waiting) for waiting in self._serving.values())
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4) if latencies else 0.0
+
+        return {
+            "queue_depth": self.queue_depth(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "latency_p50": pct(0.50),
+            "latency_p95": pct(0.95),
+            "latency_max": latencies[-1] if latencies else 0.0,
+        }
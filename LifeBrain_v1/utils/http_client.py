@@ -0,0 +1,198 @@
+# utils/http_client.py
+import asyncio
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.logger import logger
+from utils.metrics import Counter, Gauge
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+# Circuit breaker: this many failures in a row open the circuit for BREAKER_COOLDOWN seconds
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+# Adaptive timeout: p99 of recent successful latencies x HTTP_TIMEOUT_FACTOR,
+# kept between HTTP_TIMEOUT_MIN and HTTP_TIMEOUT
+HTTP_TIMEOUT_MIN = float(os.getenv("HTTP_TIMEOUT_MIN", "1"))
+HTTP_TIMEOUT_FACTOR = float(os.getenv("HTTP_TIMEOUT_FACTOR", "3"))
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+# Hedged GETs: a second request after the p95 latency, for at most HTTP_HEDGE_BUDGET of calls
+HTTP_HEDGE = os.getenv("HTTP_HEDGE", "0") == "1"
+HTTP_HEDGE_BUDGET = float(os.getenv("HTTP_HEDGE_BUDGET", "0.1"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+BREAKER_STATES = (CLOSED, HALF_OPEN, OPEN)
+
+# One pooled keep-alive client per upstream host ("scheme://netloc")
+_clients = {}
+# One breaker per upstream name (see get_json)
+breakers = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Failure and latency tracking for one upstream.
+    - closed: calls go through; BREAKER_FAILURES failures in a row open it
+    - open: calls fail fast; after BREAKER_COOLDOWN one probe call is let through
+    - half_open: the probe's success closes the circuit, its failure reopens it
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.short_circuits = 0
+        self.hedges = 0
+
+    def allow(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+            self.state = HALF_OPEN
+        if self.state == OPEN or (self.state == HALF_OPEN and self.probing):
+            self.short_circuits += 1
+            return False
+        self.probing = self.state == HALF_OPEN
+        self.calls += 1
+        return True
+
+    def success(self, seconds):
+        self.latencies.append(seconds)
+        self.failures = 0
+        self.probing = False
+        if self.state != CLOSED:
+            logger.info("Circuit for %s closed", self.name)
+            self.state = CLOSED
+
+    def failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= BREAKER_FAILURES):
+            logger.warning("Circuit for %s opened after %d failures", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def cancelled(self):
+        self.probing = False
+
+    def percentile(self, p):
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    def timeout(self):
+        """Per-call timeout derived from recent latency (HTTP_TIMEOUT until there is enough data)."""
+        if len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return HTTP_TIMEOUT
+        return min(HTTP_TIMEOUT, max(HTTP_TIMEOUT_MIN, self.percentile(0.99) * HTTP_TIMEOUT_FACTOR))
+
+    def hedge_delay(self):
+        """Seconds to wait before a hedged second request, or None to not hedge this call."""
+        if not HTTP_HEDGE or len(self.latencies) < LATENCY_MIN_SAMPLES or self.hedges >= self.calls * HTTP_HEDGE_BUDGET:
+            return None
+        return self.percentile(0.95)
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the shared AsyncClient for the host of `url`, creating it on first use."""
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    client = _clients.get(origin)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _clients[origin] = client
+    return client
+
+
+def get_breaker(name):
+    breaker = breakers.get(name)
+    if breaker is None:
+        breaker = breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+async def _get(breaker, url, params, timeout):
+    client = get_client(url)
+    delay = breaker.hedge_delay()
+    if delay is None:
+        return await client.get(url, params=params, timeout=timeout)
+    # hedge: if the first request is slower than usual, race a second one
+    first = asyncio.ensure_future(client.get(url, params=params, timeout=timeout))
+    done, _ = await asyncio.wait([first], timeout=delay)
+    if done:
+        return first.result()
+    breaker.hedges += 1
+    second = asyncio.ensure_future(client.get(url, params=params, timeout=max(timeout - delay, HTTP_TIMEOUT_MIN)))
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return first.result()  # both failed: raise the first error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_json(url: str, params=None, timeout=None, upstream=None):
+    """
+    GET `url` on the pooled client for its host and decode the JSON body.
+    Calls are tracked per `upstream` name (default: the host) by a circuit
+    breaker: while it is open this raises CircuitOpenError at once. Without
+    an explicit `timeout` the breaker's adaptive timeout is used.
+    """
+    breaker = get_breaker(upstream or urlsplit(url).netloc)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} is unavailable right now")
+    started = time.perf_counter()
+    try:
+        r = await _get(breaker, url, params, timeout or breaker.timeout())
+        if r.status_code >= 500 or r.status_code == 429:
+            r.raise_for_status()
+        data = r.json()
+    except asyncio.CancelledError:
+        breaker.cancelled()
+        raise
+    except Exception:
+        breaker.failure()
+        raise
+    breaker.success(time.perf_counter() - started)
+    return data
+
+
+async def close_clients(*_):
+    """Close every pooled client. Safe to use as an Application post_shutdown hook."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+Gauge("lifebrain_upstream_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+      ["upstream"], collect=lambda: {(name,): BREAKER_STATES.index(b.state) for name, b in breakers.items()})
+Gauge("lifebrain_upstream_timeout_seconds", "Current adaptive timeout per upstream", ["upstream"],
+      collect=lambda: {(name,): b.timeout() for name, b in breakers.items()})
+Counter("lifebrain_upstream_short_circuits_total", "Calls failed fast by an open circuit", ["upstream"],
+        collect=lambda: {(name,): b.short_circuits for name, b in breakers.items()})
+Counter("lifebrain_upstream_hedged_total", "Hedged second requests sent", ["upstream"],
+        collect=lambda: {(name,): b.hedges for name, b in breakers.items()})
@@ -0,0 +1,88 @@
+# utils/intents.py
+import json
+import os
+import random
+import re
+from functools import lru_cache
+
+INTENTS_PATH = os.getenv(
+    "INTENTS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "intents.json"),
+)
+
+
+def _trie_pattern(phrases):
+    """
+    Compile phrases into one regex shaped like a trie, e.g. ["hi", "his", "how"]
+    -> h(?:is?|ow). Matching cost then depends on the text, not on how many
+    phrases there are.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # greedy: the longer phrase is tried first, the boundary check backtracks
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class IntentEngine:
+    """
+    Matches a message against every trigger phrase in one regex pass (whole
+    words only) and picks a reply for the chat mode. When several intents
+    match, the one declared first in the data file wins.
+    """
+
+    def __init__(self, intents, fallback):
+        self.intents = intents
+        self.fallback = fallback
+        self._phrase_intent = {}
+        for index, intent in enumerate(intents):
+            for phrase in intent["triggers"]:
+                phrase = " ".join(phrase.lower().split())
+                if phrase:
+                    self._phrase_intent.setdefault(phrase, index)
+        pattern = _trie_pattern(self._phrase_intent) if self._phrase_intent else "(?!)"
+        self._regex = re.compile(r"(?<!\w)" + pattern + r"(?!\w)")
+
+    @classmethod
+    def from_file(cls, path=INTENTS_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["intents"], data["fallback"])
+
+    def match(self, text):
+        """Return the matching intent dict, or None."""
+        best = None
+        for m in self._regex.finditer(" ".join(text.lower().split())):
+            index = self._phrase_intent[m.group(0)]
+            if best is None or index < best:
+                best = index
+        return None if best is None else self.intents[best]
+
+    def respond(self, text, mode="default"):
+        """Return (intent name or None, reply) for `text` in chat `mode`."""
+        intent = self.match(text)
+        if intent is None:
+            replies = self.fallback.get(mode) or self.fallback["default"]
+            return None, random.choice(replies)
+        replies = intent["replies"].get(mode) or intent["replies"]["default"]
+        return intent["name"], random.choice(replies)
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """The shared engine, built from the data file on first use."""
+    return IntentEngine.from_file()
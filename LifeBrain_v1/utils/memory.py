@@ -1,10 +1,28 @@
 # utils/memory.py
-import sqlite3
-DB_PATH = "lifebrain.db"
+import os
+from utils import datastore
+from utils.cache import TTLCache
+
+# Columns of the memory table that may be read or written by name
+PREF_FIELDS = ("name", "city", "language", "chatmode")
+PREF_DEFAULTS = {"name": "", "city": "", "language": "", "chatmode": "default"}
+PREF_CACHE_SIZE = int(os.getenv("PREF_CACHE_SIZE", "50000"))
+PREFETCH_CHUNK = 500
+
+# user_id -> full memory row as a dict ({} if the user has none). Writes go
+# through set_user_pref, so entries never expire; the LRU bounds the size.
+prefs_cache = TTLCache("prefs", maxsize=PREF_CACHE_SIZE, ttl=float("inf"))
+
+_SELECT_ROW = "SELECT user_id, name, city, language, chatmode FROM memory WHERE user_id"
+# One upsert per whitelisted column (column names can't be bound as parameters)
+_UPSERT = {
+    field: "INSERT INTO memory (user_id, name, city, language, chatmode) VALUES (?, ?, ?, ?, ?) "
+           f"ON CONFLICT(user_id) DO UPDATE SET {field}=excluded.{field}"
+    for field in PREF_FIELDS
+}
 
 def init_memory():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""
+    datastore.write(lambda conn: conn.execute("""
         CREATE TABLE IF NOT EXISTS memory (
             user_id INTEGER PRIMARY KEY,
             name TEXT,
@@ -12,23 +30,60 @@ def init_memory():
             language TEXT,
             chatmode TEXT
         )
-        """)
-        conn.commit()
-
-def set_user_pref(user_id, field, value):
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT 1 FROM memory WHERE user_id=?", (user_id,))
-        if cur.fetchone():
-            cur.execute(f"UPDATE memory SET {field}=? WHERE user_id=?", (value, user_id))
+        """))
+
+def _check_field(field):
+    if field not in PREF_FIELDS:
+        raise ValueError(f"unknown preference field: {field}")
+
+def _row_to_prefs(row):
+    return dict(zip(PREF_FIELDS, row[1:]))
+
+async def _load_prefs(user_id):
+    await datastore.wait_for_writes(user_id)
+    row = await datastore.fetchone(f"{_SELECT_ROW}=?", (user_id,))
+    return _row_to_prefs(row) if row else {}
+
+async def get_user_prefs(user_id):
+    """The user's whole memory row as a dict ({} if none), read from the database once."""
+    return await prefs_cache.get_or_fetch(user_id, lambda: _load_prefs(user_id))
+
+async def get_user_pref(user_id, field):
+    _check_field(field)
+    prefs = await get_user_prefs(user_id)
+    return prefs.get(field)
+
+async def set_user_pref(user_id, field, value):
+    _check_field(field)
+    values = dict(PREF_DEFAULTS, **{field: value})
+    # group-committed with other writes; resolves once the transaction has committed
+    await datastore.queue_write(_UPSERT[field], (user_id, *(values[f] for f in PREF_FIELDS)), key=user_id)
+    cached = prefs_cache.get(user_id)
+    if cached is None:
+        # nothing to update; the next read loads the row
+        prefs_cache.invalidate(user_id)
+    else:
+        prefs_cache.set(user_id, dict(cached or PREF_DEFAULTS, **{field: value}))
+
+async def prefetch_prefs(user_ids):
+    """
+    Load the rows of all uncached `user_ids` in bulk queries (for scheduled
+    jobs) and return {user_id: prefs} for every requested user.
+    """
+    prefs_by_user = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        prefs = prefs_cache.get(user_id)
+        if prefs is None:
+            missing.append(user_id)
         else:
-            cur.execute("INSERT INTO memory (user_id, name, city, language, chatmode) VALUES (?, '', '', '', 'default')", (user_id,))
-            cur.execute(f"UPDATE memory SET {field}=? WHERE user_id=?", (value, user_id))
-        conn.commit()
-
-def get_user_pref(user_id, field):
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute(f"SELECT {field} FROM memory WHERE user_id=?", (user_id,))
-        row = cur.fetchone()
-        return row[0] if row and row[0] is not None else None
+            prefs_by_user[user_id] = prefs
+    for start in range(0, len(missing), PREFETCH_CHUNK):
+        chunk = missing[start:start + PREFETCH_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        rows = await datastore.fetchall(f"{_SELECT_ROW} IN ({placeholders})", tuple(chunk))
+        found = {row[0]: _row_to_prefs(row) for row in rows}
+        for user_id in chunk:
+            prefs = prefs_by_user[user_id] = found.get(user_id, {})
+            prefs_cache.set(user_id, prefs)
+    return prefs_by_user
@@ -0,0 +1,242 @@
+# utils/metrics.py
+"""
+In-process metrics in the Prometheus text format, served on a local
+/metrics endpoint. Counters, gauges and histograms live in REGISTRY.
+Counters and gauges can also be read at scrape time from a `collect()`
+callback (queue depths, cache sizes, counters kept elsewhere), which
+returns a number or {label values tuple: number}.
+"""
+import asyncio
+import functools
+import math
+import os
+import time
+from bisect import bisect_left
+
+from utils.logger import logger
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# 0 disables the endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = {}
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.collect = collect
+        self._children = {}
+        REGISTRY[name] = self
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return _Value()
+
+    def values(self):
+        """Current {label values tuple: value} of a counter or gauge."""
+        if self.collect is None:
+            return {labels: child.value for labels, child in self._children.items()}
+        values = self.collect()
+        return values if isinstance(values, dict) else {(): values}
+
+    def _samples(self):
+        try:
+            values = self.values()
+        except Exception as e:
+            logger.warning("Metric %s collect failed: %s", self.name, e)
+            return
+        for labels, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, values, le), cumulative
+            yield f"{self.name}_bucket", _format_labels(self.labelnames, values, 'le="+Inf"'), child.count
+            yield f"{self.name}_sum", _format_labels(self.labelnames, values), child.sum
+            yield f"{self.name}_count", _format_labels(self.labelnames, values), child.count
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY.values()) + "\n"
+
+
+# --- instrumentation ---
+HANDLER_SECONDS = Histogram("lifebrain_handler_seconds", "Update handler latency", ["handler"])
+HANDLER_ERRORS = Counter("lifebrain_handler_errors_total", "Update handlers that raised", ["handler"])
+HANDLER_IN_FLIGHT = Gauge("lifebrain_handler_in_flight", "Update handlers currently running", ["handler"])
+UPSTREAM_SECONDS = Histogram("lifebrain_upstream_seconds", "Upstream request latency (cache misses only)", ["upstream"])
+UPSTREAM_ERRORS = Counter("lifebrain_upstream_errors_total", "Upstream helper calls that raised", ["upstream"])
+UPSTREAM_IN_FLIGHT = Gauge("lifebrain_upstream_in_flight", "Upstream helper calls in progress", ["upstream"])
+SEND_SECONDS = Histogram("lifebrain_send_seconds", "Outbound message latency from queueing to delivery or failure",
+                         ["priority"])
+
+
+def _timed(fn, label, seconds, errors, in_flight):
+    observe = seconds.labels(label).observe
+    error = errors.labels(label)
+    running = in_flight.labels(label)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        running.inc()
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            error.inc()
+            raise
+        finally:
+            observe(time.perf_counter() - start)
+            running.dec()
+
+    return wrapper
+
+
+def instrument_handler(name, callback):
+    """Wrap a PTB handler callback with latency, error and in-flight metrics."""
+    return _timed(callback, name, HANDLER_SECONDS, HANDLER_ERRORS, HANDLER_IN_FLIGHT)
+
+
+def upstream(name):
+    """Decorator for async helpers that call an external service, placed behind any cache."""
+    return lambda fn: _timed(fn, name, UPSTREAM_SECONDS, UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT)
+
+
+# --- /metrics endpoint ---
+async def _handle(reader, writer):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b""
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on host:port (a no-op when port is 0). Returns the asyncio server."""
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle, host, port)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+        return None
+    logger.info("Metrics on http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,89 @@
+# utils/migrations.py
+from utils import datastore
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+# Never edit a shipped migration; append a new one instead.
+MIGRATIONS = [
+    # 1: baseline tasks table
+    [
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            task TEXT,
+            time TEXT
+        )
+        """,
+    ],
+    # 2: per-user lookups and ordering without a table scan
+    [
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks (user_id, id)",
+    ],
+    # 3: absolute due time (unix seconds); NULL for rows created before it existed
+    [
+        "ALTER TABLE tasks ADD COLUMN due_at INTEGER",
+    ],
+    # 4: reminder delivery state + due-time index covering only pending reminders
+    [
+        "ALTER TABLE tasks ADD COLUMN reminded INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_pending_due ON tasks (due_at) WHERE reminded = 0",
+    ],
+    # 5: one daily-summary slot per user (minute of the day, local time)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS daily_summaries (
+            user_id INTEGER PRIMARY KEY,
+            minute_of_day INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_daily_summaries_minute ON daily_summaries (minute_of_day)",
+    ],
+    # 6: persistent translation cache (second tier behind the in-memory LRU)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS translations (
+            text_hash TEXT NOT NULL,
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            translated TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            PRIMARY KEY (text_hash, source, target)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_translations_created ON translations (created_at)",
+    ],
+    # 7: last exchange rate table per base currency (JSON), for warm restarts
+    [
+        """
+        CREATE TABLE IF NOT EXISTS rate_snapshots (
+            base TEXT PRIMARY KEY,
+            rates TEXT NOT NULL,
+            fetched_at INTEGER NOT NULL
+        )
+        """,
+    ],
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _migrate(conn):
+    while True:
+        # IMMEDIATE takes the write lock before reading the version, so worker
+        # processes starting together apply each step exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        version = schema_version(conn)
+        if version >= len(MIGRATIONS):
+            conn.rollback()
+            return version
+        for sql in MIGRATIONS[version]:
+            conn.execute(sql)
+        conn.execute(f"PRAGMA user_version={version + 1}")
+        conn.commit()
+
+
+def migrate():
+    """Bring the database schema up to the latest version."""
+    return datastore.write(_migrate)
@@ -1,24 +1,79 @@
 # utils/news.py
+import asyncio
 import os
-import requests
+from collections import Counter
+from utils.cache import TTLCache
+from utils.http_client import CircuitOpenError, get_json
+from utils.metrics import upstream
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY", "")
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "900"))
+NEWS_CACHE_STALE = float(os.getenv("NEWS_CACHE_STALE", "1800"))
+NEWS_PREFETCH_TOP = int(os.getenv("NEWS_PREFETCH_TOP", "5"))
+# How long before a summary window the prefetcher runs (seconds)
+NEWS_PREFETCH_LEAD = int(os.getenv("NEWS_PREFETCH_LEAD", "120"))
 
-def get_news(topic="AI"):
+# Topic used by every daily summary
+DAILY_NEWS_TOPIC = "technology"
+
+# Keyed by (topic, language, pageSize)
+news_cache = TTLCache("news", maxsize=256, ttl=NEWS_CACHE_TTL, stale_ttl=NEWS_CACHE_STALE)
+_topic_counts = Counter()
+
+def normalize_topic(topic):
+    return " ".join(topic.split()).lower()
+
+@upstream("newsapi")
+async def _fetch_news(topic, language, page_size):
+    url = NEWS_API_URL
+    params = {"q": topic, "apiKey": NEWS_API_KEY, "language": language, "pageSize": page_size}
+    r = await get_json(url, params=params, upstream="newsapi")
+    articles = r.get("articles", [])
+    if not articles:
+        return "📰 No news found."
+    headlines = []
+    for a in articles[:page_size]:
+        title = a.get("title", "No title")
+        url = a.get("url", "")
+        headlines.append(f"🗞️ {title}\n🔗 {url}")
+    return "\n\n".join(headlines)
+
+async def get_news(topic="AI", language="en", page_size=3):
     if not NEWS_API_KEY:
         return "⚠️ News API key not set. Add NEWS_API_KEY to .env"
+    key = (normalize_topic(topic), language, page_size)
+    _count_topic(key[0])
     try:
-        url = "https://newsapi.org/v2/everything"
-        params = {"q": topic, "apiKey": NEWS_API_KEY, "language": "en", "pageSize": 3}
-        r = requests.get(url, params=params, timeout=10).json()
-        articles = r.get("articles", [])
-        if not articles:
-            return "📰 No news found."
-        headlines = []
-        for a in articles[:3]:
-            title = a.get("title", "No title")
-            url = a.get("url", "")
-            headlines.append(f"🗞️ {title}\n🔗 {url}")
-        return "\n\n".join(headlines)
+        return await news_cache.get_or_fetch(key, lambda: _fetch_news(*key))
     except Exception as e:
+        # upstream failing or circuit open: the last headlines we had, however old
+        cached = news_cache.last_known(key)
+        if cached is not None:
+            return f"{cached}\n\nℹ️ News service unavailable, showing earlier headlines."
+        if isinstance(e, CircuitOpenError):
+            return "⚠️ News service is unavailable right now, please try again later."
         return f"⚠️ News error: {e}"
+
+def _count_topic(topic):
+    _topic_counts[topic] += 1
+    # keep the counter bounded; only the head of the distribution matters
+    if len(_topic_counts) > 1000:
+        kept = _topic_counts.most_common(500)
+        _topic_counts.clear()
+        _topic_counts.update(dict(kept))
+
+def popular_topics(n=NEWS_PREFETCH_TOP):
+    return [topic for topic, _ in _topic_counts.most_common(n)]
+
+async def prefetch_news(language="en", page_size=3):
+    """Warm the cache for the daily-summary topic and the most requested topics."""
+    if not NEWS_API_KEY:
+        return
+    topics = [DAILY_NEWS_TOPIC] + [t for t in popular_topics() if t != DAILY_NEWS_TOPIC]
+    keys = [(topic, language, page_size) for topic in topics]
+    # errors are swallowed: a failed warm-up just means the next reader fetches
+    await asyncio.gather(
+        *(news_cache.refresh(key, lambda key=key: _fetch_news(*key)) for key in keys),
+        return_exceptions=True,
+    )
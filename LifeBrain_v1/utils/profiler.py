@@ -0,0 +1,171 @@
+# utils/profiler.py
+"""
+Runtime accounting for /debugstats: event-loop lag (always on, cheap),
+cache sizes and process memory, plus an opt-in profiling mode
+(PROFILE=1) that traces allocations with tracemalloc and samples the
+event-loop thread's stack to find where CPU time goes.
+"""
+import asyncio
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter, deque
+
+from utils.cache import cache_stats
+from utils.metrics import Gauge
+
+ADMIN_IDS = {int(uid) for uid in os.getenv("ADMIN_IDS", "").replace(",", " ").split()}
+PROFILE = os.getenv("PROFILE", "0") == "1"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))  # seconds between stack samples
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+LOOP_LAG_INTERVAL = 0.5
+LOOP_LAG_WINDOW = 120  # samples kept (one minute)
+
+_lag = deque(maxlen=LOOP_LAG_WINDOW)
+_lag_task = None
+_sampler = None
+_sampler_stop = threading.Event()
+_samples_lock = threading.Lock()
+_self_samples = Counter()   # innermost function -> samples
+_total_samples = Counter()  # every function on the stack -> samples
+_sample_count = 0
+_idle_samples = 0           # samples where the loop was waiting in select()
+
+
+def is_admin(user_id):
+    return user_id in ADMIN_IDS
+
+
+async def start():
+    """Start the loop-lag monitor and, with PROFILE=1, tracemalloc and the stack sampler."""
+    global _lag_task, _sampler
+    _lag_task = asyncio.create_task(_watch_lag())
+    if PROFILE:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        _sampler_stop.clear()
+        _sampler = threading.Thread(target=_sample, args=(threading.get_ident(),), name="profiler", daemon=True)
+        _sampler.start()
+
+
+async def stop():
+    global _lag_task, _sampler
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+    if _sampler is not None:
+        _sampler_stop.set()
+        _sampler.join()
+        _sampler = None
+        tracemalloc.stop()
+
+
+async def _watch_lag():
+    # a sleep that wakes up late means callbacks held the loop for that long
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        _lag.append(max(0.0, loop.time() - started - LOOP_LAG_INTERVAL))
+
+
+def loop_lag():
+    """Event-loop lag over the last minute: {"last", "avg", "max"} in seconds."""
+    if not _lag:
+        return {"last": 0.0, "avg": 0.0, "max": 0.0}
+    return {"last": _lag[-1], "avg": sum(_lag) / len(_lag), "max": max(_lag)}
+
+
+def _sample(thread_id):
+    """Thread: record the event-loop thread's stack every PROFILE_INTERVAL."""
+    global _sample_count, _idle_samples
+    while not _sampler_stop.wait(PROFILE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return
+        innermost = _describe(frame.f_code)
+        if innermost.endswith("selectors.py:select"):
+            _idle_samples += 1
+            continue
+        seen = set()
+        while frame is not None:
+            seen.add(_describe(frame.f_code))
+            frame = frame.f_back
+        with _samples_lock:
+            _sample_count += 1
+            _self_samples[innermost] += 1
+            _total_samples.update(seen)
+
+
+def _describe(code):
+    return f"{_short_path(code.co_filename)}:{code.co_name}"
+
+
+def _short_path(path):
+    for marker in ("site-packages" + os.sep, "LifeBrain_v1" + os.sep, "lib" + os.sep):
+        if marker in path:
+            return path.split(marker, 1)[1]
+    return path
+
+
+def hot_functions(n=8):
+    """Most sampled functions while the loop was busy: [(name, self share, total share), ...]."""
+    with _samples_lock:
+        if not _sample_count:
+            return []
+        return [(name, _self_samples[name] / _sample_count, _total_samples[name] / _sample_count)
+                for name, _ in _self_samples.most_common(n)]
+
+
+def top_allocators(n=8):
+    """Source lines holding the most traced memory: [(location, KiB, blocks), ...]."""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    return [(f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", stat.size / 1024, stat.count)
+            for stat in snapshot.statistics("lineno")[:n]]
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def report_lines():
+    """Process-wide sections of the /debugstats report."""
+    lag = loop_lag()
+    lines = [
+        f"Memory: RSS {rss_kib() / 1024:.1f} MiB",
+        f"Event loop lag: last {lag['last'] * 1000:.1f} ms, avg {lag['avg'] * 1000:.1f} ms, "
+        f"max {lag['max'] * 1000:.1f} ms (1 min)",
+        "",
+        "Caches (entries/max, hit ratio):",
+    ]
+    for name, stats in cache_stats().items():
+        lines.append(f"  {name}: {stats['size']}/{stats['maxsize']}, {stats['hit_ratio']:.0%}")
+    translator = sys.modules.get("utils.translator")  # only once /translate has been used
+    if translator is not None:
+        stats = translator.translation_stats()
+        lines.append(f"  translation tiers: {stats['segments']} segments, {stats['hit_ratio']:.0%} from cache "
+                     f"({stats['memory_hits']} memory, {stats['db_hits']} database), "
+                     f"{stats['saved_requests']} upstream requests saved")
+    if not PROFILE:
+        lines += ["", "Profiling off (set PROFILE=1 for allocations and hot functions)."]
+        return lines
+    current, peak = tracemalloc.get_traced_memory()
+    lines += ["", f"Top allocators (traced {current / 1048576:.1f} MiB, peak {peak / 1048576:.1f} MiB):"]
+    lines += [f"  {kib:9.1f} KiB {count:7d} blocks  {where}" for where, kib, count in top_allocators()]
+    samples = _sample_count + _idle_samples
+    idle = _idle_samples / samples if samples else 0.0
+    lines += ["", f"Hot functions ({samples} samples, loop idle {idle:.0%}; busy share self / total):"]
+    lines += [f"  {own:5.1%} {total:5.1%}  {name}" for name, own, total in hot_functions()]
+    return lines
+
+
+Gauge("lifebrain_event_loop_lag_seconds", "Event-loop lag, last sample", collect=lambda: _lag[-1] if _lag else 0.0)
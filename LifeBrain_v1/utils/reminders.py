@@ -0,0 +1,179 @@
+# utils/reminders.py
+import asyncio
+import heapq
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from utils.db import fetch_pending_reminders, claim_reminders, release_reminders, skip_missed_reminders
+from utils.logger import logger
+
+# Only reminders due within the next REMINDER_WINDOW seconds are held in memory
+REMINDER_WINDOW = int(os.getenv("REMINDER_WINDOW", "600"))
+# Hard cap on reminders loaded per window, whatever the backlog
+REMINDER_MAX_LOADED = int(os.getenv("REMINDER_MAX_LOADED", "50000"))
+REMINDER_BATCH = int(os.getenv("REMINDER_BATCH", "500"))
+# Reminders missed by more than this (e.g. bot was down) are dropped, not sent late
+REMINDER_MISSED_GRACE = int(os.getenv("REMINDER_MISSED_GRACE", "3600"))
+
+
+class ReminderEngine:
+    """
+    Fires task reminders from the persistent `tasks.due_at` index.
+
+    SQLite is the source of truth. The engine keeps a heap of
+    (due_at, task_id, user_id, text) tuples for the current window only,
+    reloads the next window when it runs out, and claims reminders in the
+    database before sending, so a restart never repeats one. Stopping in
+    the middle of a batch hands the unsent part back for the next start;
+    only a send already in flight at that moment may go out twice.
+
+    With several worker processes only one runs the engine; the others hand
+    new reminders over through `inbox` (see ReminderForwarder).
+    """
+
+    def __init__(self, send, window=REMINDER_WINDOW, max_loaded=REMINDER_MAX_LOADED, batch_size=REMINDER_BATCH,
+                 inbox=None):
+        self._send = send  # async send(user_id, text)
+        self._inbox = inbox  # multiprocessing queue of item lists, or None
+        self.window = window
+        self.max_loaded = max_loaded
+        self.batch_size = batch_size
+        self._heap = []
+        self._horizon = 0.0  # every pending reminder due before this is in the heap
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # the inbox is shared with every worker, so a sentinel on it could stop another process's listener
+        self._listening = threading.Event()
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self):
+        await skip_missed_reminders(int(time.time()) - REMINDER_MISSED_GRACE)
+        await self._reload()
+        self._task = asyncio.create_task(self._run())
+        if self._inbox is not None:
+            loop = asyncio.get_running_loop()
+            self._listening.set()
+            threading.Thread(target=self._listen, args=(loop,), name="reminder-inbox", daemon=True).start()
+
+    async def stop(self):
+        self._listening.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def loaded_by_user(self):
+        """{user_id: reminders held in memory} for the current window."""
+        return Counter(item[2] for item in self._heap)
+
+    def schedule_many(self, items):
+        """
+        Register (due_at, task_id, user_id, text) reminders that were just
+        stored. Later windows are picked up from SQLite.
+        """
+        earliest = self._heap[0][0] if self._heap else None
+        for item in items:
+            if item[0] < self._horizon:
+                heapq.heappush(self._heap, item)
+        if self._heap and (earliest is None or self._heap[0][0] < earliest):
+            self._wakeup.set()
+
+    def _listen(self, loop):
+        """Thread: feed reminders forwarded by other processes into the heap."""
+        while self._listening.is_set():
+            try:
+                items = self._inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            loop.call_soon_threadsafe(self.schedule_many, items)
+
+    async def _reload(self):
+        horizon = time.time() + self.window
+        rows = await fetch_pending_reminders(horizon, self.max_loaded)
+        self._heap = [tuple(row) for row in rows]
+        heapq.heapify(self._heap)
+        if len(rows) >= self.max_loaded:
+            # window is truncated; anything after the last loaded row waits for the next reload
+            horizon = rows[-1][0]
+        self._horizon = horizon
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            try:
+                if now >= self._horizon and not (self._heap and self._heap[0][0] <= now):
+                    await self._reload()
+                batch = []
+                while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                    batch.append(heapq.heappop(self._heap))
+                if batch:
+                    await self._fire(batch)
+                    continue
+            except Exception as e:
+                logger.exception("Reminder engine error: %s", e)
+                await asyncio.sleep(1)
+                continue
+            next_at = min(self._heap[0][0], self._horizon) if self._heap else self._horizon
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_at - now, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, batch):
+        # shielded: a claim that commits after stop() must still be handed back below
+        claim = asyncio.ensure_future(claim_reminders([item[1] for item in batch]))
+        sends = {}  # send task -> task id
+        try:
+            live = await asyncio.shield(claim)
+            for _, task_id, user_id, text in batch:
+                if task_id in live:
+                    sends[asyncio.ensure_future(self._send(user_id, text))] = task_id
+            await asyncio.gather(*sends, return_exceptions=True)
+        except asyncio.CancelledError:
+            # stopped mid-batch (the dispatcher drains a batch slowly): unclaim what
+            # was not sent yet so the next start sends it instead of losing it
+            for send in sends:
+                send.cancel()
+            delivered = {task_id for send, task_id in sends.items() if send.done() and not send.cancelled()}
+            unsent = (await claim) - delivered
+            if unsent:
+                await release_reminders(list(unsent))
+            raise
+        finally:
+            self.fired += sum(send.done() and not send.cancelled() for send in sends)
+
+
+class ReminderForwarder:
+    """
+    Stand-in for ReminderEngine in worker processes that don't own the
+    scheduler: new reminders are already in SQLite and are passed on to the
+    owning engine's inbox so it can fire them before its next reload.
+    """
+
+    def __init__(self, inbox):
+        self._inbox = inbox
+
+    def __len__(self):
+        return 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def loaded_by_user(self):
+        return Counter()
+
+    def schedule_many(self, items):
+        self._inbox.put(list(items))
@@ -1,14 +1,189 @@
 # utils/solver.py
+import ast
+import asyncio
 import math
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-def solve_expression(expr: str) -> str:
+MAX_EXPR_LENGTH = 256
+# Largest integer (in bits) any intermediate result may reach
+MAX_INT_BITS = int(os.getenv("SOLVE_MAX_INT_BITS", "10000"))
+# Largest n accepted by factorial / comb / perm
+MAX_FACTORIAL = int(os.getenv("SOLVE_MAX_FACTORIAL", "1000"))
+SOLVE_TIMEOUT = float(os.getenv("SOLVE_TIMEOUT", "2"))
+SOLVE_WORKERS = int(os.getenv("SOLVE_WORKERS", "2"))
+
+# Built once: math constants and functions usable by name
+ALLOWED_NAMES = {k: v for k, v in math.__dict__.items() if not k.startswith("_")}
+
+BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+FACTORIAL_LIKE = {"factorial", "comb", "perm"}
+# Anything containing these can be expensive and is evaluated out of process
+HEAVY_CALLS = FACTORIAL_LIKE | {"pow", "isqrt", "lcm", "gcd"}
+
+
+class SolverError(ValueError):
+    pass
+
+
+def _check_int(value):
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise SolverError("result too large")
+    return value
+
+
+def _validate(node):
+    """Reject anything that is not plain arithmetic on numbers and math.* names."""
+    if isinstance(node, ast.Expression):
+        return _validate(node.body)
+    if isinstance(node, ast.Constant):
+        if type(node.value) not in (int, float):
+            raise SolverError("only numbers are allowed")
+        return
+    if isinstance(node, ast.Name):
+        if node.id not in ALLOWED_NAMES:
+            raise SolverError(f"unknown name '{node.id}'")
+        return
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in BIN_OPS:
+            raise SolverError("operator not allowed")
+        _validate(node.left)
+        _validate(node.right)
+        return
+    if isinstance(node, ast.UnaryOp):
+        if type(node.op) not in UNARY_OPS:
+            raise SolverError("operator not allowed")
+        _validate(node.operand)
+        return
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or not callable(ALLOWED_NAMES.get(node.func.id)):
+            raise SolverError("only math functions can be called")
+        if node.keywords:
+            raise SolverError("keyword arguments are not allowed")
+        for arg in node.args:
+            _validate(arg)
+        return
+    raise SolverError(f"{type(node).__name__} is not allowed")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expr: str) -> ast.Expression:
+    """Parse and validate `expr` once; repeated expressions come from the cache."""
+    if len(expr) > MAX_EXPR_LENGTH:
+        raise SolverError("expression too long")
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError:
+        raise SolverError("invalid expression")
+    _validate(tree)
+    return tree
+
+
+def _eval(node):
+    if isinstance(node, ast.Expression):
+        return _eval(node.body)
+    if isinstance(node, ast.Constant):
+        return _check_int(node.value)
+    if isinstance(node, ast.Name):
+        return ALLOWED_NAMES[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPS[type(node.op)](_eval(node.operand))
+    if isinstance(node, ast.BinOp):
+        left, right = _eval(node.left), _eval(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_pow(left, right)
+        elif isinstance(node.op, ast.Mult) and isinstance(left, int) and isinstance(right, int):
+            if left.bit_length() + right.bit_length() > MAX_INT_BITS:
+                raise SolverError("result too large")
+        return _check_int(BIN_OPS[type(node.op)](left, right))
+    # ast.Call
+    name = node.func.id
+    args = [_eval(arg) for arg in node.args]
+    if name in FACTORIAL_LIKE and any(isinstance(a, int) and a > MAX_FACTORIAL for a in args):
+        raise SolverError(f"{name} argument too large (max {MAX_FACTORIAL})")
+    if name == "pow" and len(args) == 2:
+        _check_pow(*args)
+    return _check_int(ALLOWED_NAMES[name](*args))
+
+
+def _check_pow(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if base.bit_length() * exponent > MAX_INT_BITS:
+            raise SolverError("result too large")
+
+
+def evaluate(expr: str):
+    """Evaluate an arithmetic expression within the size limits (blocking)."""
+    return _eval(compile_expression(expr))
+
+
+def is_heavy(tree) -> bool:
+    """True if the expression may take noticeable CPU (powers, factorials, ...)."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            return True
+        if isinstance(node, ast.Call) and node.func.id in HEAVY_CALLS:
+            return True
+    return False
+
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=SOLVE_WORKERS)
+    return _pool
+
+
+def _reset_pool():
+    """Kill the pool after a timeout; a worker stuck in C code can't be interrupted."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public way to stop a running worker
+    processes = list(getattr(pool, "_processes", {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def solve_expression(expr: str) -> str:
     """
     Safely evaluate mathematical expressions using math.* functions.
-    Avoids __builtins__ for safety.
+    Light expressions run inline; heavy ones run in a process pool with a hard timeout.
     """
     try:
-        allowed_names = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
-        result = eval(expr, {"__builtins__": {}}, allowed_names)
+        tree = compile_expression(expr)
+        if not is_heavy(tree):
+            result = _eval(tree)
+        else:
+            future = asyncio.wrap_future(_get_pool().submit(evaluate, expr))
+            try:
+                result = await asyncio.wait_for(future, SOLVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                _reset_pool()
+                return "❌ Error: calculation took too long"
         return f"🧮 Result: {result}"
     except Exception as e:
         return f"❌ Error: {e}"
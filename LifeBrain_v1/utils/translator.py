@@ -1,14 +1,118 @@
 # utils/translator.py
-import requests
+import asyncio
+import hashlib
+import os
+import re
+import time
+from utils import datastore
+from utils.cache import TTLCache
+from utils.http_client import CircuitOpenError, get_json
+from utils.metrics import Counter, Gauge, upstream
 
-def translate_text(text, lang_to="en"):
+MYMEMORY_URL = os.getenv("MYMEMORY_URL", "https://api.mymemory.translated.net/get")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "86400"))
+TRANSLATION_DB_MAX_ROWS = int(os.getenv("TRANSLATION_DB_MAX_ROWS", "200000"))
+TRANSLATION_DB_MAX_AGE = int(os.getenv("TRANSLATION_DB_MAX_AGE", str(30 * 86400)))
+PRUNE_EVERY = 1000  # inserts between size/age pruning passes
+
+# Split on newlines and sentence ends, keeping the separators for reassembly
+SEGMENT_RE = re.compile(r"(\n+|(?<=[.!?])\s+)")
+
+# Tier 1: in-memory LRU keyed by (text hash, source, target); tier 2: `translations` table
+translation_cache = TTLCache("translations", maxsize=TRANSLATION_CACHE_SIZE, ttl=TRANSLATION_CACHE_TTL)
+_counters = {"segments": 0, "db_hits": 0, "upstream": 0, "inserts": 0}
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+@upstream("mymemory")
+async def _fetch_translation(text, source, target):
+    url = MYMEMORY_URL
+    params = {"q": text, "langpair": f"{source}|{target}"}
+    _counters["upstream"] += 1
+    r = await get_json(url, params=params, upstream="mymemory")
+    translated = r.get("responseData", {}).get("translatedText")
+    # quota/warning responses still carry text; never store them
+    if r.get("responseStatus") not in (200, "200") or not translated:
+        raise RuntimeError(r.get("responseDetails") or "Translation failed.")
+    return translated
+
+def _prune(conn):
+    conn.execute("DELETE FROM translations WHERE created_at < ?", (int(time.time()) - TRANSLATION_DB_MAX_AGE,))
+    conn.execute(
+        "DELETE FROM translations WHERE created_at <= "
+        "(SELECT created_at FROM translations ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+        (TRANSLATION_DB_MAX_ROWS,),
+    )
+
+async def _load_segment(key, text):
+    """Tier 2 (SQLite) then upstream; the result is written back to SQLite."""
+    text_hash, source, target = key
+    row = await datastore.fetchone(
+        "SELECT translated FROM translations WHERE text_hash=? AND source=? AND target=? AND created_at >= ?",
+        (text_hash, source, target, int(time.time()) - TRANSLATION_DB_MAX_AGE),
+    )
+    if row:
+        _counters["db_hits"] += 1
+        return row[0]
+    translated = await _fetch_translation(text, source, target)
+    await datastore.execute(
+        "INSERT OR REPLACE INTO translations (text_hash, source, target, translated, created_at) VALUES (?, ?, ?, ?, ?)",
+        (text_hash, source, target, translated, int(time.time())),
+    )
+    _counters["inserts"] += 1
+    if _counters["inserts"] % PRUNE_EVERY == 0:
+        await datastore.run_write(_prune)
+    return translated
+
+async def _translate_segment(text, source, target):
+    _counters["segments"] += 1
+    key = (_text_hash(text), source, target)
+    return await translation_cache.get_or_fetch(key, lambda: _load_segment(key, text))
+
+async def translate_text(text, lang_to="en", lang_from="auto"):
     """
     Simple wrapper using MyMemory free API for quick translations.
+    Multi-sentence input is split so only uncached segments are fetched (concurrently).
     """
     try:
-        url = "https://api.mymemory.translated.net/get"
-        params = {"q": text, "langpair": f"auto|{lang_to}"}
-        r = requests.get(url, params=params, timeout=10).json()
-        return r.get("responseData", {}).get("translatedText", "⚠️ Translation failed.")
+        parts = SEGMENT_RE.split(text.strip())
+        segments, separators = parts[0::2], parts[1::2]
+        unique = list({normalize_text(s) for s in segments if s.strip()})
+        results = await asyncio.gather(*(_translate_segment(s, lang_from, lang_to) for s in unique))
+        translated = dict(zip(unique, results))
+        out = []
+        for i, segment in enumerate(segments):
+            out.append(translated.get(normalize_text(segment), segment))
+            if i < len(separators):
+                out.append(separators[i])
+        return "".join(out) or "⚠️ Translation failed."
+    except CircuitOpenError:
+        return "⚠️ Translation service is unavailable right now, please try again later."
     except Exception as e:
         return f"⚠️ Translation error: {e}"
+
+def translation_stats():
+    """Hit ratio across both tiers and how many upstream requests the caches saved."""
+    segments = _counters["segments"]
+    saved = segments - _counters["upstream"]
+    return {
+        "segments": segments,
+        "memory_hits": translation_cache.hits + translation_cache.coalesced,
+        "db_hits": _counters["db_hits"],
+        "upstream_requests": _counters["upstream"],
+        "saved_requests": saved,
+        "hit_ratio": round(saved / segments, 4) if segments else 0.0,
+    }
+
+Counter("lifebrain_translation_segments_total", "Translated segments by the tier that answered", ["tier"],
+        collect=lambda: {("memory",): translation_stats()["memory_hits"], ("database",): _counters["db_hits"],
+                         ("upstream",): _counters["upstream"]})
+Counter("lifebrain_translation_saved_requests_total", "Segments answered without an upstream request",
+        collect=lambda: translation_stats()["saved_requests"])
+Gauge("lifebrain_translation_hit_ratio", "Share of segments answered by either cache tier",
+      collect=lambda: translation_stats()["hit_ratio"])
@@ -0,0 +1,79 @@
+# utils/update_processor.py
+import asyncio
+import os
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Updates handled at the same time (across different users)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "64"))
+# PTB's own limit only bounds updates waiting here; the real limit is ours
+UPDATE_BACKLOG = int(os.getenv("UPDATE_BACKLOG", "100000"))
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Runs updates from different users concurrently (up to `concurrency`) and
+    updates from the same user strictly one after another, in arrival order.
+
+    A user's lock is taken before a concurrency slot, so a user with a
+    backlog waits without holding slots other users could run in. Locks are
+    reference counted and dropped once nothing for that user is in flight or
+    waiting, so memory follows active users, not all users ever seen.
+    """
+
+    def __init__(self, concurrency=UPDATE_CONCURRENCY, backlog=UPDATE_BACKLOG):
+        super().__init__(max(backlog, concurrency))
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._users = {}  # user/chat id -> [asyncio.Lock, updates holding or waiting for it]
+        self.pending = 0  # updates inside do_process_update, running or waiting
+        self.running = 0
+
+    @staticmethod
+    def _key(update):
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return update.effective_user.id
+            if update.effective_chat is not None:
+                return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._key(update)
+        self.pending += 1
+        try:
+            if key is None:
+                async with self._slots:
+                    await self._run(coroutine)
+                return
+            entry = self._users.get(key)
+            if entry is None:
+                entry = self._users[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                async with entry[0], self._slots:
+                    await self._run(coroutine)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._users[key]
+        finally:
+            self.pending -= 1
+
+    async def _run(self, coroutine):
+        self.running += 1
+        try:
+            await coroutine
+        finally:
+            self.running -= 1
+
+    def waiting(self):
+        """Updates queued behind an earlier update of the same user or for a free slot."""
+        return self.pending - self.running
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
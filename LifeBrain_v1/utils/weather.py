@@ -1,21 +1,43 @@
 # utils/weather.py
 import os
-import requests
+from utils.cache import TTLCache
+from utils.http_client import CircuitOpenError, get_json
+from utils.metrics import upstream
 
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_CACHE_STALE = float(os.getenv("WEATHER_CACHE_STALE", "1800"))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "1024"))
 
-def get_weather(city):
+weather_cache = TTLCache("weather", maxsize=WEATHER_CACHE_SIZE, ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_CACHE_STALE)
+
+def normalize_city(city):
+    return " ".join(city.split()).lower()
+
+@upstream("openweather")
+async def _fetch_weather(city):
+    url = OPENWEATHER_URL
+    params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
+    r = await get_json(url, params=params, upstream="openweather")
+    if r.get("cod") != 200:
+        return "❌ City not found."
+    desc = r["weather"][0]["description"].title()
+    temp = r["main"]["temp"]
+    humidity = r["main"]["humidity"]
+    return f"🌤️ Weather in {city.title()}: {desc}\n🌡️ {temp}°C | 💧 {humidity}%"
+
+async def get_weather(city):
     if not OPENWEATHER_KEY:
         return "⚠️ Weather API key not set. Add OPENWEATHER_API_KEY to .env"
+    key = normalize_city(city)
     try:
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
-        r = requests.get(url, params=params, timeout=10).json()
-        if r.get("cod") != 200:
-            return "❌ City not found."
-        desc = r["weather"][0]["description"].title()
-        temp = r["main"]["temp"]
-        humidity = r["main"]["humidity"]
-        return f"🌤️ Weather in {city.title()}: {desc}\n🌡️ {temp}°C | 💧 {humidity}%"
+        return await weather_cache.get_or_fetch(key, lambda: _fetch_weather(key))
     except Exception as e:
+        # upstream failing or circuit open: the last answer we had, however old
+        cached = weather_cache.last_known(key)
+        if cached is not None:
+            return f"{cached}\nℹ️ Weather service unavailable, showing the last known report."
+        if isinstance(e, CircuitOpenError):
+            return "⚠️ Weather service is unavailable right now, please try again later."
         return f"⚠️ Weather error: {e}"
@@ -0,0 +1,371 @@
+# utils/webhook.py
+"""
+Webhook serving mode: one front process receives updates over HTTP and
+shards them by user to N worker processes, each running its own
+Application. A user's updates always go to the same worker, so they stay
+in order; different users spread across cores. Worker 0 owns the
+scheduler (reminders, daily summaries); the others forward new reminders
+to it.
+
+Telegram's global send limit (SEND_GLOBAL_RATE) is per bot, so the workers
+split it: worker 0 sends every reminder and daily summary and gets most of
+it, the others only answer their users and get WEBHOOK_WORKER_SEND_RATE
+each (see send_rate_share()). Per-chat buckets are per process: a chat's
+replies come from its own worker but its reminders and summaries from
+worker 0, so at worst a chat sees twice SEND_CHAT_RATE, and any RetryAfter
+Telegram answers with is retried after the wait it asks for.
+
+The front is a small ASGI app, served by uvicorn when it is installed and
+by a minimal built-in HTTP/1.1 server otherwise.
+
+Local test without Telegram (point TELEGRAM_BASE_URL at a fake Bot API to
+capture the replies):
+
+    BOT_MODE=webhook WEBHOOK_SECRET=test python main.py
+    curl -X POST localhost:8443/telegram \\
+         -H "X-Telegram-Bot-Api-Secret-Token: test" -H "Content-Type: application/json" \\
+         -d '{"update_id": 1, "message": {"message_id": 1, "date": 0, "text": "/solve 2+2",
+              "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+              "chat": {"id": 42, "type": "private"}, "from": {"id": 42, "is_bot": false, "first_name": "T"}}}'
+"""
+import asyncio
+import hmac
+import json
+import multiprocessing
+import os
+import queue
+import secrets
+import signal
+from http import HTTPStatus
+
+from utils.logger import logger, setup_logging
+from utils.metrics import METRICS_PORT, Counter, start_metrics_server
+
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# Public URL Telegram should post to; when set, the webhook is registered at startup
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").strip()
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "").strip()
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", str(os.cpu_count() or 1)))
+# Updates buffered per worker before the front answers 503 (Telegram retries later)
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+# Messages/s each worker other than the scheduler worker may send (interactive replies)
+WEBHOOK_WORKER_SEND_RATE = float(os.getenv("WEBHOOK_WORKER_SEND_RATE", "2"))
+WEBHOOK_MAX_BODY = 1024 * 1024
+SCHEDULER_WORKER = 0
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+WEBHOOK_UPDATES = Counter("lifebrain_webhook_updates_total", "Webhook posts by outcome", ["result"])
+
+
+def update_user_id(update):
+    """The user (or chat) an update belongs to; updates without one fall back to their id."""
+    for value in update.values():
+        if isinstance(value, dict):
+            for key in ("from", "user", "chat"):
+                owner = value.get(key)
+                if isinstance(owner, dict) and "id" in owner:
+                    return owner["id"]
+    return update.get("update_id", 0)
+
+
+class WebhookApp:
+    """ASGI app: checks the secret token and routes each update to its worker's queue."""
+
+    def __init__(self, queues, secret="", path=WEBHOOK_PATH, is_alive=None):
+        self.queues = queues
+        self.secret = secret.encode()
+        self.path = path
+        self.is_alive = is_alive  # callable(index) -> bool, for /healthz
+        self.received = WEBHOOK_UPDATES.labels("accepted")
+        self.rejected = WEBHOOK_UPDATES.labels("forbidden")
+        self.invalid = WEBHOOK_UPDATES.labels("bad_request")
+        self.overloaded = WEBHOOK_UPDATES.labels("overloaded")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        if scope["type"] != "http":
+            return
+        if scope["path"] == "/healthz" and scope["method"] == "GET":
+            alive = [self.is_alive(i) if self.is_alive else True for i in range(len(self.queues))]
+            body = {"workers": len(alive), "alive": sum(alive),
+                    "received": self.received.value, "rejected": self.rejected.value}
+            return await _respond(send, HTTPStatus.OK if all(alive) else HTTPStatus.SERVICE_UNAVAILABLE, body)
+        if scope["path"] != self.path:
+            return await _respond(send, HTTPStatus.NOT_FOUND)
+        if scope["method"] != "POST":
+            return await _respond(send, HTTPStatus.METHOD_NOT_ALLOWED)
+        if self.secret:
+            token = dict(scope["headers"]).get(SECRET_HEADER, b"")
+            if not hmac.compare_digest(token, self.secret):
+                self.rejected.inc()
+                return await _respond(send, HTTPStatus.FORBIDDEN)
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > WEBHOOK_MAX_BODY:
+                return await _respond(send, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            if not message.get("more_body"):
+                break
+        try:
+            update = json.loads(body)
+            worker = update_user_id(update) % len(self.queues)
+        except (ValueError, TypeError, AttributeError):
+            self.invalid.inc()
+            return await _respond(send, HTTPStatus.BAD_REQUEST)
+        try:
+            self.queues[worker].put_nowait(update)
+        except queue.Full:
+            self.overloaded.inc()
+            return await _respond(send, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.received.inc()
+        await _respond(send, HTTPStatus.OK)
+
+
+async def _respond(send, status, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    headers = [(b"content-type", b"application/json")] if body is not None else []
+    await send({"type": "http.response.start", "status": int(status), "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+# --- minimal HTTP/1.1 server for when uvicorn isn't installed ---
+async def _handle_connection(app, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            header_map = dict(headers)
+            length = int(header_map.get(b"content-length", b"0"))
+            if length > WEBHOOK_MAX_BODY:
+                writer.write(b"HTTP/1.1 413 Request Entity Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                break
+            body = await reader.readexactly(length)
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": version.partition("/")[2],
+                "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+                "query_string": query.encode(), "headers": headers,
+                "client": writer.get_extra_info("peername"), "server": writer.get_extra_info("sockname"),
+            }
+            keep_alive = header_map.get(b"connection", b"").lower() != b"close" and version != "HTTP/1.0"
+            response = {"status": 500, "headers": [], "written": False, "chunked": False}
+
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            def head(framing):
+                lines = [f"HTTP/1.1 {response['status']} {HTTPStatus(response['status']).phrase}".encode()]
+                lines += [name + b": " + value for name, value in response["headers"]]
+                lines.append(framing)
+                lines.append(b"Connection: keep-alive" if keep_alive else b"Connection: close")
+                response["written"] = True
+                return b"\r\n".join(lines) + b"\r\n\r\n"
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = message.get("headers", [])
+                    return
+                chunk, more = message.get("body", b""), message.get("more_body", False)
+                if not response["chunked"] and not more:
+                    writer.write(head(b"Content-Length: %d" % len(chunk)) + chunk)
+                    return
+                # streamed response (e.g. server-sent events): chunked transfer encoding
+                if not response["chunked"]:
+                    response["chunked"] = True
+                    writer.write(head(b"Transfer-Encoding: chunked"))
+                if chunk:
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                if not more:
+                    writer.write(b"0\r\n\r\n")
+                await writer.drain()
+
+            await app(scope, receive, send)
+            if not response["written"]:
+                writer.write(head(b"Content-Length: 0"))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    except asyncio.CancelledError:
+        # shut down mid-request; returning quietly keeps asyncio.streams (3.11) from logging a traceback
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT, stop=None):
+    """Serve the ASGI `app` until `stop` (an asyncio.Event) is set."""
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if uvicorn is not None:
+        server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, lifespan="off", log_level="warning"))
+        task = asyncio.create_task(server.serve())
+        # uvicorn may handle the signal itself; either way both sides stop
+        await asyncio.wait({task, asyncio.create_task(stop.wait())}, return_when=asyncio.FIRST_COMPLETED)
+        server.should_exit = True
+        await task
+        stop.set()
+        return
+    server = await asyncio.start_server(lambda r, w: _handle_connection(app, r, w), host, port)
+    async with server:
+        await stop.wait()
+
+
+# --- worker processes ---
+def _next_batch(updates):
+    """Thread: block for one update, then take whatever else is already queued."""
+    batch = [updates.get()]
+    try:
+        while batch[-1] is not None and len(batch) < 100:
+            batch.append(updates.get_nowait())
+    except queue.Empty:
+        pass
+    return batch
+
+
+def send_rate_share(index, workers):
+    """Messages/s worker `index` of `workers` may send; together they send at most SEND_GLOBAL_RATE."""
+    from utils.dispatcher import SEND_GLOBAL_RATE
+
+    if workers == 1:
+        return SEND_GLOBAL_RATE
+    # the interactive-only workers never get more than half of it together
+    share = min(WEBHOOK_WORKER_SEND_RATE, SEND_GLOBAL_RATE / 2 / (workers - 1))
+    return SEND_GLOBAL_RATE - share * (workers - 1) if index == SCHEDULER_WORKER else share
+
+
+async def _run_worker(build_app, index, workers, updates, reminder_inbox):
+    from telegram import Update
+
+    # the front serves /metrics on METRICS_PORT, worker i on METRICS_PORT + 1 + i
+    port = METRICS_PORT + 1 + index if METRICS_PORT else 0
+    app = build_app(scheduler=index == SCHEDULER_WORKER, reminder_inbox=reminder_inbox, port=port,
+                    send_rate=send_rate_share(index, workers))
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    loop = asyncio.get_running_loop()
+    try:
+        running = True
+        while running:
+            for data in await loop.run_in_executor(None, _next_batch, updates):
+                if data is None:
+                    running = False
+                    break
+                try:
+                    update = Update.de_json(data, app.bot)
+                except Exception as e:
+                    # the front only checked the body is JSON; a malformed update must not take the worker down
+                    logger.error("Dropping malformed update %s: %r", data.get("update_id") if isinstance(data, dict) else None, e)
+                    continue
+                await app.update_queue.put(update)
+    finally:
+        await app.stop()
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+def _worker_main(build_app, index, workers, updates, reminder_inbox):
+    # the front process handles Ctrl+C and tells workers to stop through their queue
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(_run_worker(build_app, index, workers, updates, reminder_inbox))
+
+
+async def _register_webhook(token, base_url, secret):
+    from telegram import Bot
+
+    kwargs = {"base_url": base_url} if base_url else {}
+    async with Bot(token, **kwargs) as bot:
+        await bot.set_webhook(WEBHOOK_URL, secret_token=secret, drop_pending_updates=False)
+
+
+def run_webhook(build_app, token, base_url="", workers=WEBHOOK_WORKERS):
+    """
+    Run the front server and `workers` worker processes until interrupted.
+    `build_app(scheduler, reminder_inbox, port, send_rate)` must be a picklable
+    module-level function returning a configured telegram.ext.Application;
+    `send_rate` is the worker's share of the bot's global send budget.
+    """
+    secret = WEBHOOK_SECRET
+    if WEBHOOK_URL and not secret:
+        secret = secrets.token_urlsafe(32)
+    if not secret:
+        logger.warning("WEBHOOK_SECRET is not set; accepting updates from anyone.")
+
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue(WEBHOOK_QUEUE_SIZE) for _ in range(workers)]
+    reminder_inbox = ctx.Queue()
+    processes = [None] * workers
+
+    def spawn(index):
+        processes[index] = ctx.Process(
+            target=_worker_main, args=(build_app, index, workers, queues[index], reminder_inbox),
+            name=f"lifebrain-worker-{index}",
+        )
+        processes[index].start()
+
+    async def supervise(stop):
+        while not stop.is_set():
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    logger.error("Worker %s exited with code %s; restarting", index, process.exitcode)
+                    spawn(index)
+            await asyncio.sleep(1)
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # e.g. Windows: Ctrl+C raises KeyboardInterrupt instead
+        if WEBHOOK_URL:
+            await _register_webhook(token, base_url, secret)
+        app = WebhookApp(queues, secret, is_alive=lambda i: processes[i].is_alive())
+        supervisor = asyncio.create_task(supervise(stop))
+        metrics_server = await start_metrics_server(METRICS_PORT)
+        logger.info("🌐 Webhook server on %s:%s%s with %s workers", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, workers)
+        await serve(app, WEBHOOK_HOST, WEBHOOK_PORT, stop)
+        if metrics_server is not None:
+            metrics_server.close()
+        await supervisor
+
+    for index in range(workers):
+        spawn(index)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for updates in queues:
+            updates.put(None)
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()